@@ -0,0 +1,247 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures wall time, SQL query count and time (through
+an execute wrapper on every database connection, see :func:`instrument`) and
+template render time (through the ``EventPlanner.template_backend`` engine)
+for a sampled share of requests (``PERF_SAMPLE_RATE``), keyed by the resolved
+URL name. Each sampled response gets a ``Server-Timing`` header; queries
+repeated at least ``PERF_DUPLICATE_QUERY_THRESHOLD`` times in one request are
+logged as likely N+1 patterns. Aggregates are kept per process in
+:data:`registry` and exported in Prometheus text format by
+``EventPlanner.views.metrics``.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = ContextVar('perf_request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_time', 'template_time', 'template_depth', 'signatures')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper hook, reached through :func:`instrument` on every connection."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+            # Parameters are placeholders in ``sql``, so the same statement in a loop shares a signature
+            self.signatures[sql] += 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.signatures.items() if count >= threshold}
+
+
+class _Series:
+    """Count, sum and a bounded reservoir of recent samples for quantiles."""
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self, size):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=size)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in QUANTILES}
+
+
+class Registry:
+    METRICS = (
+        ('duration', 'http_request_duration_seconds', 'Request wall time'),
+        ('queries', 'http_request_db_queries', 'SQL queries per request'),
+        ('sql_time', 'http_request_db_duration_seconds', 'SQL time per request'),
+        ('template_time', 'http_request_template_duration_seconds', 'Template render time per request'),
+    )
+
+    def __init__(self, reservoir_size=1024):
+        self.reservoir_size = reservoir_size
+        self.lock = threading.Lock()
+        self.series = {}
+        self.duplicates = Counter()
+
+    def observe(self, view, duration, stats, duplicate_count):
+        values = {
+            'duration': duration,
+            'queries': stats.queries,
+            'sql_time': stats.sql_time,
+            'template_time': stats.template_time,
+        }
+        with self.lock:
+            for metric, value in values.items():
+                key = (metric, view)
+                if key not in self.series:
+                    self.series[key] = _Series(self.reservoir_size)
+                self.series[key].add(value)
+            if duplicate_count:
+                self.duplicates[view] += duplicate_count
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+            self.duplicates.clear()
+
+    def prometheus(self):
+        """Render every series as a Prometheus summary."""
+        with self.lock:
+            snapshot = {key: (s.count, s.total, s.quantiles()) for key, s in self.series.items()}
+            duplicates = dict(self.duplicates)
+
+        lines = []
+        for metric, name, help_text in self.METRICS:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} summary']
+            for (series_metric, view), (count, total, quantiles) in sorted(snapshot.items()):
+                if series_metric != metric:
+                    continue
+                for q, value in quantiles.items():
+                    lines.append(f'{name}{{view="{view}",quantile="{q}"}} {value:g}')
+                lines.append(f'{name}_sum{{view="{view}"}} {total:g}')
+                lines.append(f'{name}_count{{view="{view}"}} {count}')
+        lines += [
+            '# HELP http_request_duplicate_queries_total Statements repeated within one request (likely N+1)',
+            '# TYPE http_request_duplicate_queries_total counter',
+        ]
+        lines += [f'http_request_duplicate_queries_total{{view="{view}"}} {n}' for view, n in sorted(duplicates.items())]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(getattr(settings, 'PERF_RESERVOIR_SIZE', 1024))
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def instrument(connection, **kwargs):
+    """Count ``connection``'s queries towards whichever sampled request runs them.
+
+    Installed on every connection as it is opened rather than around the
+    request, because the async ORM runs queries through ``sync_to_async`` on
+    another thread's connections. That thread sees the request's stats through
+    the copied context.
+    """
+    if _record_query not in connection.execute_wrappers:
+        # First, so connection.execute_wrapper() blocks still pop their own wrapper on exit
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(instrument)
+
+
+@contextmanager
+def template_timer():
+    """Add the time spent inside the block to the current request's template time.
+
+    Used by ``EventPlanner.template_backend``. Only the outermost render counts;
+    nested ones (crispy forms, includes) are inside it.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_time += time.perf_counter() - started
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+        self.duplicate_threshold = getattr(settings, 'PERF_DUPLICATE_QUERY_THRESHOLD', 3)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _sampled(self):
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def _start(self):
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = (match.view_name if match else None) or 'unresolved'
+        duplicates = stats.duplicates(self.duplicate_threshold)
+        if duplicates:
+            for sql, count in duplicates.items():
+                logger.warning('%s ran the same query %d times (possible N+1): %s', view, count, sql)
+        registry.observe(view, duration, stats, sum(duplicates.values()))
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={duration * 1000:.1f}',
+            f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries ({len(duplicates)} duplicated)"',
+            f'tpl;dur={stats.template_time * 1000:.1f}',
+        ])
+        return response
@@ -48,12 +48,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_bootstrap5',
-    'django_crontab',
     'events.apps.EventsConfig',
     'accounts.apps.AccountsConfig',
 ]
 
 MIDDLEWARE = [
+    'EventPlanner.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,11 +63,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.UserProfileBackend',
+    # Still resolves sessions that were signed in before UserProfileBackend
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 ROOT_URLCONF = 'EventPlanner.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'EventPlanner.template_backend.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,6 +100,42 @@ DATABASES = {
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Writers wait on each other instead of failing at once. Transactions that read before
+    # they write can still hit "database is locked"; events.services retries those.
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'timeout': 20,
+    })
+
+
+# Cache
+# CACHE_URL selects the backend: locmem:// (default, per process), file:///path/to/dir
+# or redis://host:6379/0 (needs the redis package). Page and fragment caching of the
+# event views lives in events.caching.
+CACHE_URL = config('CACHE_URL', default='locmem://')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_URL[len('file://'):]}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'event-planner'}}
+
+EVENT_CACHE_ALIAS = 'default'
+# Anonymous pages also change as time passes (events ending), so keep them short-lived
+EVENT_PAGE_CACHE_SECONDS = config('EVENT_PAGE_CACHE_SECONDS', cast=int, default=60)
+EVENT_FRAGMENT_CACHE_SECONDS = config('EVENT_FRAGMENT_CACHE_SECONDS', cast=int, default=600)
+
+
+# Request performance metrics (EventPlanner.middleware)
+# Share of requests instrumented; each sampled response carries a Server-Timing header.
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', cast=float, default=1.0)
+# A statement repeated this many times within one request is logged as a likely N+1
+PERF_DUPLICATE_QUERY_THRESHOLD = config('PERF_DUPLICATE_QUERY_THRESHOLD', cast=int, default=3)
+PERF_RESERVOIR_SIZE = config('PERF_RESERVOIR_SIZE', cast=int, default=1024)
+# Bearer token required by /metrics; without one only staff (or DEBUG) may read it
+PERF_METRICS_TOKEN = config('PERF_METRICS_TOKEN', default='')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -164,11 +206,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_HOST_USER = 'your-email@gmail.com'
 # EMAIL_HOST_PASSWORD = 'your-password'
 
-# Crontab Configuration
-CRONJOBS = [
-    ('0 9 * * *', 'events.cron.send_event_reminders'),
-    ('0 10 * * *', 'events.cron.send_rating_requests'),
-]
+# Event jobs (events.jobs): reminders are due this many hours before the start;
+# run `python manage.py process_jobs` to execute due jobs.
+EVENT_REMINDER_LEAD_HOURS = config('EVENT_REMINDER_LEAD_HOURS', cast=int, default=48)
 
 # Honor X-Forwarded-Proto/Host headers when behind a proxy (e.g., Vercel)
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
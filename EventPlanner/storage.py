@@ -0,0 +1,59 @@
+"""Shared media storage for uploaded event images and avatars.
+
+The media root is picked on first use rather than at import: the
+``MEDIA_ROOT`` environment variable, else ``settings.MEDIA_ROOT`` if it can be
+written to, else ``/tmp/media`` (the only writable path on many serverless
+hosts). Importing the models therefore does no filesystem I/O, which keeps cold
+starts cheap. Model fields pass :func:`media_storage` itself as ``storage`` so
+migrations record a stable reference instead of a path.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+FALLBACK_MEDIA_ROOT = '/tmp/media'
+
+
+def _writable(path):
+    try:
+        os.makedirs(path, exist_ok=True)
+        test_path = os.path.join(path, '.write-test')
+        with open(test_path, 'wb') as f:
+            f.write(b'1')
+        os.remove(test_path)
+        return True
+    except OSError:
+        return False
+
+
+def resolve_media_root():
+    media_root = os.environ.get('MEDIA_ROOT') or getattr(settings, 'MEDIA_ROOT', None)
+    if media_root and _writable(media_root):
+        return str(media_root)
+    try:
+        os.makedirs(FALLBACK_MEDIA_ROOT, exist_ok=True)
+    except OSError:
+        pass
+    return FALLBACK_MEDIA_ROOT
+
+
+class MediaStorage(FileSystemStorage):
+    """FileSystemStorage that resolves its root once, on first use.
+
+    ``FileSystemStorage`` clears this cache when ``MEDIA_ROOT`` changes
+    (``override_settings`` in tests), so the root is then picked again.
+    """
+
+    @cached_property
+    def base_location(self):
+        return resolve_media_root()
+
+
+_storage = MediaStorage()
+
+
+def media_storage():
+    return _storage
@@ -0,0 +1,24 @@
+"""Django template engine that reports render time to ``PerformanceMiddleware``.
+
+Configured as the ``BACKEND`` in ``TEMPLATES``; it only differs from the stock
+``DjangoTemplates`` engine in that the templates it hands out time their
+``render()`` inside the current sampled request.
+"""
+from django.template.backends.django import DjangoTemplates, Template
+
+from EventPlanner.middleware import template_timer
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with template_timer():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
@@ -1,7 +1,33 @@
+import mimetypes
 import os
+import re
+import secrets
+import stat
+
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views import View
+from django.views.decorators.cache import never_cache
+
+from events import caching
+from events.images import RENDITION_DIR
+from .middleware import registry
+
+
+# Rendition files are named "renditions/<first 16 hex chars of sha256>-<size>.<ext>" (see events.images).
+# Only the worker writes there; uploads elsewhere can be replaced under the same name
+CONTENT_HASHED_NAME = re.compile(rf'^{re.escape(RENDITION_DIR)}/([0-9a-f]{{16}})-[^/]+$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RESOLVED_CACHE_SIZE = 4096
+STREAM_BLOCK_SIZE = 64 * 1024
+CONDITIONAL_HEADERS = {'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE'}
 
 
 class MediaServeView(View):
@@ -9,6 +35,16 @@ class MediaServeView(View):
 
     Also remaps legacy default filenames to their correct subpaths so that
     old URLs keep working after changing default storage paths.
+
+    The root a path was found under is remembered per process, so a repeat
+    request costs a single ``stat``; entries are dropped as soon as the file
+    disappears. Responses carry strong ETags, answer conditional and ``Range``
+    requests, and content-hashed rendition names are cached as immutable.
+
+    Set ``MEDIA_SENDFILE`` to ``'x-sendfile'`` (Apache/lighttpd) or
+    ``'x-accel-redirect'`` (nginx, with an ``internal`` location at
+    ``MEDIA_ACCEL_REDIRECT_PREFIX`` aliased to ``/``) to let the web server
+    stream the bytes.
     """
 
     LEGACY_MAP = {
@@ -18,35 +54,178 @@ class MediaServeView(View):
         'event_default.jpg': 'event_pics/event_default.png',
     }
 
-    def get(self, request, path):
-        # Remap legacy paths if requested
-        remapped_path = self.LEGACY_MAP.get(path, path)
-
-        candidate_roots = []
-        # 1) settings.MEDIA_ROOT
-        if getattr(settings, 'MEDIA_ROOT', None):
-            candidate_roots.append(settings.MEDIA_ROOT)
-        # 2) Env-provided MEDIA_ROOT or /tmp/media (writable on many PaaS)
-        env_media_root = os.environ.get('MEDIA_ROOT')
-        if env_media_root:
-            candidate_roots.append(env_media_root)
-        candidate_roots.append('/tmp/media')
-        # 3) Repo media folder (read-only)
-        base_dir = getattr(settings, 'BASE_DIR', None)
-        if base_dir:
-            candidate_roots.append(os.path.join(str(base_dir), 'media'))
-
-        # Try to serve from the first existing file
-        for root in candidate_roots:
-            file_path = os.path.join(root, remapped_path)
-            if os.path.exists(file_path) and os.path.isfile(file_path):
-                return FileResponse(open(file_path, 'rb'))
-
-        # As a fallback, try the original path across roots if a remap was applied
-        if remapped_path != path:
-            for root in candidate_roots:
-                original_file_path = os.path.join(root, path)
-                if os.path.exists(original_file_path) and os.path.isfile(original_file_path):
-                    return FileResponse(open(original_file_path, 'rb'))
+    _roots = None
+    _resolved = {}
+
+    @classmethod
+    def candidate_roots(cls):
+        if cls._roots is None:
+            roots = []
+            # 1) settings.MEDIA_ROOT
+            if getattr(settings, 'MEDIA_ROOT', None):
+                roots.append(settings.MEDIA_ROOT)
+            # 2) Env-provided MEDIA_ROOT or /tmp/media (writable on many PaaS)
+            env_media_root = os.environ.get('MEDIA_ROOT')
+            if env_media_root:
+                roots.append(env_media_root)
+            roots.append('/tmp/media')
+            # 3) Repo media folder (read-only)
+            base_dir = getattr(settings, 'BASE_DIR', None)
+            if base_dir:
+                roots.append(os.path.join(str(base_dir), 'media'))
+            # MEDIA_ROOT usually is the repo media folder; never stat the same root twice
+            cls._roots = list(dict.fromkeys(os.path.abspath(str(root)) for root in roots))
+        return cls._roots
+
+    @classmethod
+    def invalidate(cls, path=None):
+        """Forget the resolved location of ``path``, or of everything (and the roots)."""
+        if path is None:
+            cls._resolved.clear()
+            cls._roots = None
+        else:
+            cls._resolved.pop(path, None)
+
+    @classmethod
+    def resolve(cls, path):
+        """Return ``(file_path, stat_result)`` for ``path`` or raise Http404."""
+        file_path = cls._resolved.get(path)
+        if file_path is not None:
+            try:
+                return file_path, os.stat(file_path)
+            except OSError:
+                cls.invalidate(path)
+
+        # Try the remapped path first, then the original if a remap was applied
+        remapped_path = cls.LEGACY_MAP.get(path, path)
+        names = [remapped_path] if remapped_path == path else [remapped_path, path]
+        for name in names:
+            for root in cls.candidate_roots():
+                try:
+                    file_path = safe_join(root, name)
+                    st = os.stat(file_path)
+                except (OSError, SuspiciousFileOperation):
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    if len(cls._resolved) >= RESOLVED_CACHE_SIZE:
+                        cls._resolved.clear()
+                    cls._resolved[path] = file_path
+                    return file_path, st
 
         raise Http404("Media file not found")
+
+    def get(self, request, path):
+        file_path, st = self.resolve(path)
+
+        hashed = CONTENT_HASHED_NAME.match(path)
+        etag = quote_etag(hashed.group(1) if hashed else f'{st.st_mtime_ns:x}-{st.st_size:x}')
+        last_modified = int(st.st_mtime)
+
+        if CONDITIONAL_HEADERS.intersection(request.META):
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return self._set_cache_headers(not_modified, hashed)
+
+        sendfile = getattr(settings, 'MEDIA_SENDFILE', '')
+        if sendfile:
+            # The web server handles the body, including Range requests
+            response = HttpResponse(content_type=self._content_type(file_path))
+            if sendfile == 'x-accel-redirect':
+                prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/internal-media')
+                response['X-Accel-Redirect'] = prefix.rstrip('/') + file_path
+            else:
+                response['X-Sendfile'] = file_path
+        else:
+            response = self._range_response(request, file_path, st.st_size, etag)
+            if response is None:
+                response = FileResponse(open(file_path, 'rb'))
+                response.block_size = STREAM_BLOCK_SIZE
+            response['Accept-Ranges'] = 'bytes'
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return self._set_cache_headers(response, hashed)
+
+    def _range_response(self, request, file_path, size, etag):
+        """Serve a single ``bytes=`` range; None means send the whole file."""
+        match = RANGE_HEADER.match(request.headers.get('Range', '').replace(' ', ''))
+        if not match or not size:
+            return None
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag:
+            return None
+
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            return None
+        if start >= size or start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            self._read(file_path, start, length), status=206, content_type=self._content_type(file_path)
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+        return response
+
+    @staticmethod
+    def _read(file_path, start, length, chunk_size=STREAM_BLOCK_SIZE):
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def _content_type(file_path):
+        return mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+
+    @staticmethod
+    def _set_cache_headers(response, hashed):
+        if hashed:
+            # Set directly: these responses never carry another Cache-Control to merge with
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', 3600)}"
+        return response
+
+
+@receiver(setting_changed)
+def _reset_media_roots(setting, **kwargs):
+    if setting in ('MEDIA_ROOT', 'BASE_DIR'):
+        MediaServeView.invalidate()
+
+
+@never_cache
+def metrics(request):
+    """Request and cache metrics of this process in Prometheus text format."""
+    token = getattr(settings, 'PERF_METRICS_TOKEN', '')
+    if token:
+        authorized = secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        authorized = settings.DEBUG or request.user.is_staff
+    if not authorized:
+        return HttpResponseForbidden()
+
+    lines = [
+        '# HELP event_cache_requests_total Page and fragment cache lookups',
+        '# TYPE event_cache_requests_total counter',
+    ]
+    for name, entry in caching.metrics().items():
+        for result in ('hits', 'misses'):
+            lines.append(f'event_cache_requests_total{{cache="{name}",result="{result}"}} {entry[result]}')
+    body = registry.prometheus() + '\n'.join(lines) + '\n'
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+UserModel = get_user_model()
+
+
+class UserProfileBackend(ModelBackend):
+    """ModelBackend that loads the signed-in user together with their profile.
+
+    Every authenticated page shows the profile avatar in the sidebar, so the
+    join saves a query per request.
+    """
+
+    def _users(self):
+        return UserModel._default_manager.select_related('profile')
+
+    def get_user(self, user_id):
+        try:
+            user = self._users().get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await self._users().aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
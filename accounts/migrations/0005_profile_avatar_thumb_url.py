@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+def backfill_thumb_urls(apps, schema_editor):
+    Profile = apps.get_model('accounts', 'Profile')
+    storage = Profile._meta.get_field('avatar').storage
+    profiles = list(Profile.objects.only('avatar', 'avatar_renditions'))
+    for profile in profiles:
+        thumb = (profile.avatar_renditions or {}).get('thumb')
+        if thumb:
+            profile.avatar_thumb_url = storage.url(thumb['jpeg'])
+        elif profile.avatar:
+            profile.avatar_thumb_url = storage.url(profile.avatar.name)
+    Profile.objects.bulk_update(profiles, ['avatar_thumb_url'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_profile_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_thumb_url',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_thumb_urls, migrations.RunPython.noop),
+    ]
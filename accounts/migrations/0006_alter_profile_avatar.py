@@ -0,0 +1,22 @@
+import EventPlanner.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_profile_avatar_thumb_url'),
+    ]
+
+    operations = [
+        # Storage is not a column attribute; record it without rebuilding accounts_profile on SQLite
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='profile',
+                    name='avatar',
+                    field=models.ImageField(default='profile_pics/default.jpg', storage=EventPlanner.storage.media_storage, upload_to='profile_pics'),
+                ),
+            ],
+        ),
+    ]
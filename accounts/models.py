@@ -1,38 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
-from PIL import Image
-import os
-
-
-def _resolve_media_storage():
-    """Return a FileSystemStorage that writes to a writable media root.
-
-    Prefers env MEDIA_ROOT, then settings.MEDIA_ROOT if writable,
-    otherwise falls back to /tmp/media (writable on many PaaS).
-    """
-    media_root = os.environ.get('MEDIA_ROOT') or getattr(settings, 'MEDIA_ROOT', None)
-    if media_root:
-        try:
-            os.makedirs(media_root, exist_ok=True)
-            test_path = os.path.join(media_root, '.write-test')
-            with open(test_path, 'wb') as f:
-                f.write(b'1')
-            os.remove(test_path)
-        except Exception:
-            media_root = '/tmp/media'
-    else:
-        media_root = '/tmp/media'
-    try:
-        os.makedirs(media_root, exist_ok=True)
-    except Exception:
-        pass
-    base_url = getattr(settings, 'MEDIA_URL', '/media/')
-    return FileSystemStorage(location=media_root, base_url=base_url)
-
-
-_profile_media_storage = _resolve_media_storage()
+from EventPlanner.storage import media_storage
+from events import images
 
 
 class Profile(models.Model):
@@ -40,22 +9,105 @@ class Profile(models.Model):
     bio = models.TextField(max_length=500, blank=True)
     location = models.CharField(max_length=30, blank=True)
     birth_date = models.DateField(null=True, blank=True)
-    avatar = models.ImageField(default='profile_pics/default.jpg', upload_to='profile_pics', storage=_profile_media_storage)
+    avatar = models.ImageField(default='profile_pics/default.jpg', upload_to='profile_pics', storage=media_storage)
+    # Written by the image worker (events.images); see RENDITIONS
+    avatar_hash = models.CharField(max_length=64, blank=True, editable=False)
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # URL of the thumbnail (the original upload until it is rendered), so avatar lists need no storage lookups
+    avatar_thumb_url = models.CharField(max_length=500, blank=True, editable=False)
+    
+    RENDITION_FIELDS = ('avatar_hash', 'avatar_renditions', 'avatar_thumb_url')
+    # Fields the user edits; compared against the loaded row to find unsaved changes
+    EDITABLE_FIELDS = ('bio', 'location', 'birth_date', 'avatar')
+    
+    RENDITIONS = {
+        'avatar': {
+            'avatar': (300, 300, True),
+            'thumb': (100, 100, True),
+        },
+    }
     
     def __str__(self):
         return f"{self.user.username}'s Profile"
     
+    @property
+    def avatar_image(self):
+        return images.rendition(self, 'avatar', 'avatar')
+    
+    @property
+    def avatar_thumb(self):
+        return images.rendition(self, 'avatar', 'thumb')
+    
+    def thumb_url(self):
+        """URL of the avatar thumbnail, falling back to the original until the worker renders it."""
+        if not self.avatar:
+            return ''
+        thumb = self.avatar_thumb
+        if thumb:
+            return self.avatar.storage.url(thumb['jpeg'])
+        return self.avatar.url
+    
+    @classmethod
+    def renditions_changed(cls, pk):
+        profile = cls.objects.only('avatar', 'avatar_renditions').filter(pk=pk).first()
+        if profile is not None:
+            cls.objects.filter(pk=pk, avatar=profile.avatar.name).update(avatar_thumb_url=profile.thumb_url())
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in instance._editable_values().items() if name in field_names
+        }
+        return instance
+    
+    def _editable_values(self):
+        values = {}
+        for name in self.EDITABLE_FIELDS:
+            if name in self.__dict__:
+                # Files compare by name, so checking the avatar never opens it
+                value = self.__dict__[name]
+                values[name] = getattr(value, 'name', value)
+        return values
+    
+    def changed_fields(self):
+        """Editable fields whose value differs from the row as loaded (all of them for a new profile)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return set(self.EDITABLE_FIELDS)
+        return {
+            name for name, value in self._editable_values().items()
+            if name in loaded and value != loaded[name]
+        }
+    
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        loaded_avatar = getattr(self, '_loaded_values', {}).get('avatar')
+        avatar_changed = (
+            (update_fields is None or 'avatar' in update_fields)
+            and self.avatar.name != loaded_avatar
+        )
+        
+        if avatar_changed:
+            # Store a new upload now so the thumbnail URL has its final name
+            self._meta.get_field('avatar').pre_save(self, self._state.adding)
+            images.reset(self, 'avatar')
+            self.avatar_thumb_url = self.thumb_url()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields).union(self.RENDITION_FIELDS)
+        elif not self._state.adding and update_fields is None:
+            # Leave renditions to the image worker unless the avatar was replaced
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.RENDITION_FIELDS
+            ]
         
-        # Resize image only if the file exists (skip missing defaults)
-        if self.avatar and os.path.isfile(getattr(self.avatar, 'path', '')):
-            try:
-                img = Image.open(self.avatar.path)
-                if img.height > 300 or img.width > 300:
-                    output_size = (300, 300)
-                    img.thumbnail(output_size)
-                    img.save(self.avatar.path)
-            except Exception:
-                # Silently skip resize if file cannot be opened
-                pass
+        # Resizing happens out of request: the image worker renders the avatar sizes
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if avatar_changed:
+                images.enqueue(self, 'avatar')
+        saved = self._editable_values()
+        if update_fields is not None:
+            saved = {name: value for name, value in saved.items() if name in update_fields}
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **saved}
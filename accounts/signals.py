@@ -5,11 +5,21 @@ from .models import Profile
 
 
 @receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
+def sync_profile(sender, instance, created, raw=False, **kwargs):
+    """Create the profile of a new user; afterwards save only edits made through ``user.profile``.
+
+    Most User saves (``last_login`` on every login, password changes) never
+    load the profile, so they cost no profile query at all.
+    """
+    if raw:
+        return
     if created:
         Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
+        return
+    related = User.profile.related
+    profile = related.get_cached_value(instance) if related.is_cached(instance) else None
+    if profile is None:
+        return
+    changed = profile.changed_fields()
+    if changed:
+        profile.save(update_fields=changed)
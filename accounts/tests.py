@@ -1,3 +1,49 @@
-from django.test import TestCase
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.models import User
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
 
-# Create your tests here.
+from events.models import ImageJob
+from .models import Profile
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProfileSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('member', 'member@example.com', 'pass')
+
+    def test_new_user_gets_a_profile(self):
+        self.assertTrue(Profile.objects.filter(user=self.user).exists())
+
+    def test_login_does_not_touch_the_profile(self):
+        request = RequestFactory().post('/accounts/login/')
+        SessionMiddleware(lambda r: HttpResponse()).process_request(request)
+        user = authenticate(request, username='member', password='pass')
+        with self.assertNumQueries(5) as captured:  # session key check, savepoint, insert, release, last_login
+            login(request, user)
+        self.assertFalse(any('accounts_profile' in q['sql'] for q in captured.captured_queries))
+
+    def test_user_save_without_profile_edits_skips_profile(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile  # loaded but unchanged
+        with self.assertNumQueries(1):
+            user.save()
+
+    def test_profile_edits_are_saved_with_the_user(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.bio = 'Hello'
+        jobs_before = ImageJob.objects.count()
+        user.save()
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.bio, 'Hello')
+        self.assertEqual(user.profile.changed_fields(), set())
+        # Only the bio changed, so no avatar work was queued
+        self.assertEqual(ImageJob.objects.count(), jobs_before)
+
+    def test_avatar_change_queues_renditions(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.avatar = 'profile_pics/new.jpg'
+        self.assertEqual(profile.changed_fields(), {'avatar'})
+        profile.save(update_fields=profile.changed_fields())
+        self.assertTrue(ImageJob.objects.filter(object_id=profile.pk, field_name='avatar', status='pending').exists())
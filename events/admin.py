@@ -1,17 +1,142 @@
-from django.contrib import admin
-from .models import Event, RSVP, Rating, ReminderLog
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import FloatField, Max
+from django.db.models.functions import Cast, NullIf
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import caching
+from .models import Event, EventJob, ImageJob, RSVP, Rating, ReminderLog
+
+
+# Below this many rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+# Bulk actions update this many events per statement
+ACTION_CHUNK_SIZE = 1000
+
+
+def estimated_row_count(model):
+    """Fast approximate row count of ``model``'s table, from planner statistics where available."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                return row[0]
+    # SQLite keeps no row statistics; the highest id is one index lookup and close enough
+    return model._default_manager.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Changelist paginator that estimates the size of large unfiltered tables instead of counting them."""
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if not query.where:
+            estimate = estimated_row_count(self.object_list.model)
+            if estimate > EXACT_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def _chunked_ids(queryset):
+    """Primary keys of ``queryset`` in lists of ``ACTION_CHUNK_SIZE``."""
+    ids = queryset.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        chunk = list(ids.filter(pk__gt=last)[:ACTION_CHUNK_SIZE])
+        if chunk:
+            yield chunk
+        if len(chunk) < ACTION_CHUNK_SIZE:
+            return
+        last = chunk[-1]
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
-    list_display = ['title', 'date', 'time', 'location', 'creator', 'attendee_count']
-    list_filter = ['date', 'creator']
+    list_display = ['title', 'date', 'time', 'location', 'creator', 'going_count', 'rating_count', 'average_rating', 'is_completed']
+    list_filter = ['is_completed', 'date', ('creator', admin.RelatedOnlyFieldListFilter)]
+    list_select_related = ['creator']
     search_fields = ['title', 'location', 'description']
     date_hierarchy = 'date'
+    actions = ['mark_completed', 'undo_completed', 'resend_reminders']
+
+    def get_queryset(self, request):
+        # Averages come from the denormalized counters, so sorting by them needs no join
+        return super().get_queryset(request).annotate(
+            average_rating_value=Cast('rating_sum', FloatField()) / NullIf('rating_count', 0),
+        )
+
+    @admin.display(description='Average rating', ordering='average_rating_value')
+    def average_rating(self, obj):
+        if obj.average_rating_value is None:
+            return '-'
+        return f'{obj.average_rating_value:.1f}'
+
+    @admin.action(description='Mark selected events as completed')
+    def mark_completed(self, request, queryset):
+        now = timezone.now()
+        count = 0
+        # Like saving an event's completion status, this leaves its queued jobs alone
+        for ids in _chunked_ids(queryset.filter(is_completed=False)):
+            count += Event.objects.filter(pk__in=ids, is_completed=False).update(is_completed=True, updated_at=now)
+            # update() sends no signals
+            caching.touch(ids, listing=True)
+        self.message_user(request, f'Marked {count} event(s) as completed.', messages.SUCCESS)
+
+    @admin.action(description='Undo completed on selected events')
+    def undo_completed(self, request, queryset):
+        now = timezone.now()
+        count = 0
+        for ids in _chunked_ids(queryset.filter(is_completed=True)):
+            count += Event.objects.filter(pk__in=ids, is_completed=True).update(is_completed=False, updated_at=now)
+            caching.touch(ids, listing=True)
+        self.message_user(request, f'{count} event(s) are no longer marked as completed.', messages.SUCCESS)
+
+    @admin.action(description='Resend reminders for selected upcoming events')
+    def resend_reminders(self, request, queryset):
+        """Forget the pre-event reminders already sent and have the job worker send them again now."""
+        now = timezone.now()
+        count = 0
+        upcoming = queryset.filter(is_completed=False, date__gte=now.date())
+        for ids in _chunked_ids(upcoming):
+            with transaction.atomic():
+                ReminderLog.objects.filter(event_id__in=ids, reminder_type='pre_event').delete()
+                EventJob.objects.filter(
+                    event_id__in=ids, kind='event_reminder', status='pending'
+                ).update(due_at=now, attempts=0, last_error='')
+                EventJob.objects.bulk_create(
+                    [EventJob(event_id=pk, kind='event_reminder', due_at=now) for pk in ids],
+                    ignore_conflicts=True,
+                )
+            count += len(ids)
+        self.message_user(
+            request, f'Queued reminders for {count} upcoming event(s); the job worker sends them.', messages.SUCCESS
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows."""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+    list_select_related = ['user', 'event']
+    raw_id_fields = ['user', 'event']
 
 
 @admin.register(RSVP)
-class RSVPAdmin(admin.ModelAdmin):
+class RSVPAdmin(LargeTableAdmin):
     list_display = ['user', 'event', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['user__username', 'event__title']
@@ -21,11 +146,27 @@ class RSVPAdmin(admin.ModelAdmin):
 class RatingAdmin(admin.ModelAdmin):
     list_display = ['user', 'event', 'stars', 'created_at']
     list_filter = ['stars', 'created_at']
+    list_select_related = ['user', 'event']
+    raw_id_fields = ['user', 'event']
     search_fields = ['user__username', 'event__title']
 
 
 @admin.register(ReminderLog)
-class ReminderLogAdmin(admin.ModelAdmin):
+class ReminderLogAdmin(LargeTableAdmin):
     list_display = ['event', 'user', 'reminder_type', 'sent_at']
     list_filter = ['reminder_type', 'sent_at']
     search_fields = ['event__title', 'user__username']
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    list_display = ['model_label', 'object_id', 'field_name', 'status', 'attempts', 'updated_at']
+    list_filter = ['status', 'model_label']
+
+
+@admin.register(EventJob)
+class EventJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'event', 'due_at', 'status', 'attempts', 'updated_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['event']
+    ordering = ['due_at']
@@ -0,0 +1,334 @@
+"""Versioned JSON API (``/api/v1/``) for events, RSVPs and ratings.
+
+Every read is a ``values()`` projection of just the requested columns:
+
+- ``fields=title,date`` picks the event fields returned (default: all of ``EVENT_FIELDS``)
+- ``include=counts,rating,viewer`` adds RSVP counts per status, the rating
+  summary with its 1-5 star histogram (read from the event row) and the
+  signed-in user's RSVP status; counts and viewer cost one query per page each
+- lists use keyset pagination (``cursor=``, ``page_size=``) over ``(date, time, id)``
+
+Responses carry an ETag of their body and answer ``If-None-Match`` with 304.
+Writes use the session (and CSRF token) of the signed-in user.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import transaction
+from django.db.models import Count
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from .models import Event, RSVP, Rating
+from .pagination import KeysetPaginator
+from .search import search_events
+from .services import set_rsvp_status
+
+
+# API field name -> ORM lookup
+EVENT_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'date': 'date',
+    'time': 'time',
+    'location': 'location',
+    'capacity': 'capacity',
+    'end_datetime': 'end_datetime',
+    'is_completed': 'is_completed',
+    'going_count': 'going_count',
+    'creator': 'creator__username',
+}
+INCLUDES = ('counts', 'rating', 'viewer')
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_BULK_RSVPS = 100
+# Columns needed for the keyset cursor and for the RSVP/rating rules, whatever was asked for
+KEY_COLUMNS = ('id', 'date', 'time')
+STATE_COLUMNS = ('is_completed', 'end_datetime', 'date')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """Turn ``ApiError`` into a JSON error response."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            try:
+                return await view(request, *args, **kwargs)
+            except ApiError as e:
+                return JsonResponse({'error': str(e)}, status=e.status)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+    return wrapper
+
+
+def _require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Authentication required', status=401)
+    return request.user
+
+
+def _json_body(request):
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Request body must be JSON')
+    if not isinstance(body, dict):
+        raise ApiError('Request body must be a JSON object')
+    return body
+
+
+def _respond(request, data, status=200):
+    """JSON response with an ETag of its body; 304 when the client already has it."""
+    response = JsonResponse(data, status=status)
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    if request.method == 'GET':
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+    response['ETag'] = etag
+    return response
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _selection(request):
+    """Return ``(fields, includes)`` requested by ``fields=`` and ``include=``."""
+    fields = _split(request.GET.get('fields')) or list(EVENT_FIELDS)
+    unknown = [f for f in fields if f not in EVENT_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    includes = _split(request.GET.get('include'))
+    unknown = [i for i in includes if i not in INCLUDES]
+    if unknown:
+        raise ApiError(f"Unknown include(s): {', '.join(unknown)}")
+    return fields, includes
+
+
+def _projection(fields, includes):
+    columns = {EVENT_FIELDS[f] for f in fields} | set(KEY_COLUMNS)
+    if 'rating' in includes:
+        columns |= {'rating_count', 'rating_sum', *Event.RATING_HISTOGRAM_FIELDS}
+    return sorted(columns)
+
+
+def _include_querysets(rows, includes, user):
+    """``(counts, viewer)`` querysets for the includes that need a query (empty when not asked for).
+
+    Left unevaluated so sync and async views can each run them their own way.
+    """
+    ids = [row['id'] for row in rows]
+    counts = viewer = RSVP.objects.none()
+    if 'counts' in includes and ids:
+        counts = RSVP.objects.filter(event_id__in=ids).values('event_id', 'status').annotate(n=Count('pk')).order_by()
+    if 'viewer' in includes and ids and user.is_authenticated:
+        viewer = RSVP.objects.filter(event_id__in=ids, user=user).values_list('event_id', 'status')
+    return counts, viewer
+
+
+def _serialize(rows, fields, includes, count_rows, viewer_rows):
+    """Shape ``values()`` rows into API objects, adding the requested includes."""
+    counts = {}
+    for row in count_rows:
+        counts.setdefault(row['event_id'], {})[row['status']] = row['n']
+    viewer = dict(viewer_rows)
+
+    results = []
+    for row in rows:
+        item = {field: row[EVENT_FIELDS[field]] for field in fields}
+        if 'counts' in includes:
+            by_status = counts.get(row['id'], {})
+            item['counts'] = {status: by_status.get(status, 0) for status, _ in RSVP.STATUS_CHOICES}
+        if 'rating' in includes:
+            item['rating'] = {
+                'count': row['rating_count'],
+                'average': round(row['rating_sum'] / row['rating_count'], 2) if row['rating_count'] else None,
+                'histogram': {stars: row[f'rating_stars_{stars}'] for stars in range(1, 6)},
+            }
+        if 'viewer' in includes:
+            item['viewer_rsvp_status'] = viewer.get(row['id'])
+        results.append(item)
+    return results
+
+
+def _filtered_events(request):
+    events_qs = Event.objects.all()
+    params = request.GET
+    if params.get('search'):
+        events_qs = search_events(events_qs, params['search'])
+    for param, lookup in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        if params.get(param):
+            value = parse_date(params[param]) if len(params[param]) == 10 else None
+            if value is None:
+                raise ApiError(f'{param} must be YYYY-MM-DD')
+            events_qs = events_qs.filter(**{lookup: value})
+    if params.get('completed') in ('true', 'false'):
+        events_qs = events_qs.filter(is_completed=params['completed'] == 'true')
+    if params.get('creator'):
+        events_qs = events_qs.filter(creator__username=params['creator'])
+    if params.get('location'):
+        events_qs = events_qs.filter(location__icontains=params['location'])
+    return events_qs
+
+
+@require_GET
+@api_view
+def event_list(request):
+    fields, includes = _selection(request)
+    try:
+        page_size = max(1, min(int(request.GET.get('page_size', PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('page_size must be an integer')
+
+    rows = _filtered_events(request).values(*_projection(fields, includes))
+    page = KeysetPaginator(rows, page_size).page(request.GET.get('cursor'))
+    counts, viewer = _include_querysets(page.object_list, includes, request.user)
+    return _respond(request, {
+        'results': _serialize(page.object_list, fields, includes, counts, viewer),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_GET
+@api_view
+async def event_detail(request, pk):
+    """One event. Runs natively under ASGI, so waiting on the database holds no thread."""
+    fields, includes = _selection(request)
+    row = await Event.objects.filter(pk=pk).values(*_projection(fields, includes)).afirst()
+    if row is None:
+        raise ApiError('Event not found', status=404)
+    counts, viewer = _include_querysets([row], includes, await request.auser())
+    count_rows = [item async for item in counts]
+    viewer_rows = [item async for item in viewer]
+    return _respond(request, _serialize([row], fields, includes, count_rows, viewer_rows)[0])
+
+
+def _is_past(state, now):
+    if state['end_datetime']:
+        return now > state['end_datetime']
+    return now.date() > state['date']
+
+
+def _rsvp_error(state, now):
+    """Why an RSVP to an event in ``state`` is refused, or None (same rules as the HTML view)."""
+    if state is None:
+        return 'Event not found'
+    if state['is_completed']:
+        return 'Cannot update attendance for completed events.'
+    if _is_past(state, now):
+        return 'Cannot attend past events.'
+    return None
+
+
+def _rsvp_status(value):
+    if value not in ('going', 'not_going'):
+        raise ApiError("status must be 'going' or 'not_going'")
+    return value
+
+
+@require_http_methods(['GET', 'PUT', 'POST'])
+@api_view
+def event_rsvp(request, pk):
+    """GET the viewer's RSVP to an event; PUT/POST ``{"status": "going" | "not_going"}`` to set it."""
+    user = _require_user(request)
+    state = Event.objects.filter(pk=pk).values(*STATE_COLUMNS).first()
+    if state is None:
+        raise ApiError('Event not found', status=404)
+
+    if request.method == 'GET':
+        status = RSVP.objects.filter(event_id=pk, user=user).values_list('status', flat=True).first()
+        return _respond(request, {'event': pk, 'status': status})
+
+    status = _rsvp_status(_json_body(request).get('status'))
+    error = _rsvp_error(state, timezone.now())
+    if error:
+        raise ApiError(error, status=409)
+    return _respond(request, {'event': pk, 'status': set_rsvp_status(pk, user, status)})
+
+
+@require_POST
+@api_view
+def bulk_rsvp(request):
+    """Apply ``{"rsvps": [{"event": id, "status": ...}, ...]}`` in one transaction.
+
+    Every change is validated first; if any is refused nothing is applied and
+    the errors are returned by position.
+    """
+    user = _require_user(request)
+    items = _json_body(request).get('rsvps')
+    if not isinstance(items, list) or not items:
+        raise ApiError('rsvps must be a non-empty list')
+    if len(items) > MAX_BULK_RSVPS:
+        raise ApiError(f'At most {MAX_BULK_RSVPS} RSVPs per request')
+
+    event_ids = [item.get('event') if isinstance(item, dict) else None for item in items]
+    states = {
+        row['id']: row
+        for row in Event.objects.filter(pk__in=[pk for pk in event_ids if isinstance(pk, int)]).values('id', *STATE_COLUMNS)
+    }
+    now = timezone.now()
+    errors = {}
+    for index, (item, event_id) in enumerate(zip(items, event_ids)):
+        status = item.get('status') if isinstance(item, dict) else None
+        if status not in ('going', 'not_going'):
+            errors[index] = "status must be 'going' or 'not_going'"
+        else:
+            error = _rsvp_error(states.get(event_id), now)
+            if error:
+                errors[index] = error
+    if errors:
+        return JsonResponse({'error': 'No RSVP was applied', 'errors': errors}, status=409)
+
+    with transaction.atomic():
+        results = [
+            {'event': event_id, 'status': set_rsvp_status(event_id, user, item['status'])}
+            for item, event_id in zip(items, event_ids)
+        ]
+    return _respond(request, {'results': results})
+
+
+@require_POST
+@api_view
+def event_rating(request, pk):
+    """Submit or replace the viewer's ``{"stars": 1-5, "feedback": "..."}`` for an attended past event."""
+    user = _require_user(request)
+    state = Event.objects.filter(pk=pk).values(*STATE_COLUMNS).first()
+    if state is None:
+        raise ApiError('Event not found', status=404)
+    if not _is_past(state, timezone.now()):
+        raise ApiError('You can only rate events that have already happened.', status=409)
+    if not RSVP.objects.filter(event_id=pk, user=user, status='going').exists():
+        raise ApiError('You can only rate events that you actually attended.', status=403)
+
+    body = _json_body(request)
+    stars, feedback = body.get('stars'), body.get('feedback', '')
+    if not isinstance(stars, int) or isinstance(stars, bool) or not 1 <= stars <= 5:
+        raise ApiError('stars must be an integer from 1 to 5')
+    if not isinstance(feedback, str):
+        raise ApiError('feedback must be a string')
+
+    rating, created = Rating.objects.update_or_create(
+        event_id=pk, user=user, defaults={'stars': stars, 'feedback': feedback}
+    )
+    return _respond(request, {'event': pk, 'stars': rating.stars, 'feedback': rating.feedback}, status=201 if created else 200)
@@ -0,0 +1,204 @@
+"""Anonymous page and per-event fragment caching.
+
+Cached entries record the *version tokens* of what they were rendered from:
+``list`` (which events exist and their order) and ``event:<pk>`` for every
+event shown. ``events.signals`` bumps those tokens on ``post_save`` /
+``post_delete`` of ``Event``, ``RSVP`` and ``Rating``, so one RSVP only
+invalidates the fragments and pages that show that event. A missing token
+(evicted, or never set) never matches, so eviction can only cause a miss.
+
+Everything lives in the cache alias ``EVENT_CACHE_ALIAS`` (default
+``'default'``; see ``CACHE_URL`` in settings). Hit/miss counts are kept per
+process and served by :func:`metrics`.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+
+KEY_PREFIX = 'events:cache'
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'EVENT_CACHE_ALIAS', 'default')]
+
+
+def page_timeout():
+    return getattr(settings, 'EVENT_PAGE_CACHE_SECONDS', 60)
+
+
+def fragment_timeout():
+    return getattr(settings, 'EVENT_FRAGMENT_CACHE_SECONDS', 600)
+
+
+def record(kind, name, hit):
+    with _metrics_lock:
+        _metrics[(kind, name, 'hits' if hit else 'misses')] += 1
+
+
+def metrics():
+    """Return ``{'page:events-home': {'hits': n, 'misses': n, 'hit_ratio': r}, ...}``."""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    result = {}
+    for (kind, name, outcome), count in sorted(snapshot.items()):
+        result.setdefault(f'{kind}:{name}', {'hits': 0, 'misses': 0})[outcome] = count
+    for entry in result.values():
+        total = entry['hits'] + entry['misses']
+        entry['hit_ratio'] = round(entry['hits'] / total, 4) if total else 0.0
+    return result
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+# Version tokens
+
+def _version_key(dependency):
+    return f'{KEY_PREFIX}:v:{dependency}'
+
+
+def event_dependency(event_id):
+    return f'event:{event_id}'
+
+
+def _new_token():
+    return time.time_ns()
+
+
+def versions(dependencies):
+    """Current token of each dependency, creating tokens that do not exist yet."""
+    cache = _cache()
+    keys = {_version_key(dep): dep for dep in dependencies}
+    found = cache.get_many(list(keys))
+    missing = {key: _new_token() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {dep: found[key] for key, dep in keys.items()}
+
+
+def _bump(dependencies):
+    _cache().set_many({_version_key(dep): _new_token() for dep in dependencies}, timeout=None)
+
+
+def touch(event_ids=(), listing=False):
+    """Invalidate everything rendered from ``event_ids`` (and the event lists if ``listing``).
+
+    Bumps now and again after the surrounding transaction commits, so a page
+    rendered from pre-commit data in between cannot stay cached.
+    """
+    dependencies = [event_dependency(pk) for pk in event_ids]
+    if listing:
+        dependencies.append('list')
+    if not dependencies:
+        return
+    _bump(dependencies)
+    transaction.on_commit(lambda: _bump(dependencies))
+
+
+def attach_versions(events):
+    """Set ``cache_version`` on each event so card fragments need no extra cache round trip."""
+    events = list(events)
+    current = versions(event_dependency(event.pk) for event in events)
+    for event in events:
+        event.cache_version = current[event_dependency(event.pk)]
+    return events
+
+
+# Fragments
+
+def fragment_key(name, event_id, version, vary=()):
+    vary_hash = hashlib.md5(repr(tuple(vary)).encode()).hexdigest()
+    return f'{KEY_PREFIX}:fragment:{name}:{event_id}:{version}:{vary_hash}'
+
+
+def get_or_render_fragment(name, event, render, vary=()):
+    version = getattr(event, 'cache_version', None)
+    if version is None:
+        version = versions([event_dependency(event.pk)])[event_dependency(event.pk)]
+    key = fragment_key(name, event.pk, version, vary)
+    cache = _cache()
+    content = cache.get(key)
+    record('fragment', name, content is not None)
+    if content is None:
+        content = render()
+        cache.set(key, content, fragment_timeout())
+    return content
+
+
+# Pages
+
+def page_cacheable(request):
+    """Only anonymous GETs without pending flash messages share a cached page."""
+    if request.method not in ('GET', 'HEAD') or 'messages' in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def _page_key(name, request):
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{KEY_PREFIX}:page:{name}:{path_hash}'
+
+
+def get_page(name, request):
+    cache = _cache()
+    entry = cache.get(_page_key(name, request))
+    hit = entry is not None and versions(entry['versions']) == entry['versions']
+    record('page', name, hit)
+    if not hit:
+        return None
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def set_page(name, request, response, page_versions):
+    """Store a rendered page with the dependency tokens read before it was rendered."""
+    entry = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'versions': page_versions,
+    }
+    _cache().set(_page_key(name, request), entry, page_timeout())
+    response['X-Cache'] = 'MISS'
+
+
+class AnonymousPageCacheMixin:
+    """Serve anonymous GETs of a template view from the page cache.
+
+    Views name their cache with ``page_cache_name`` and return the
+    dependencies of a rendered page from ``page_cache_dependencies``.
+    """
+    page_cache_name = None
+
+    def page_cache_dependencies(self, context):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if not page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        cached = get_page(self.page_cache_name, request)
+        if cached is not None:
+            return cached
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and getattr(response, 'context_data', None) is not None:
+            # Tokens are read before rendering; changes committed later bump them again,
+            # and the page TTL bounds the short window between the queries and this read
+            page_versions = versions(self.page_cache_dependencies(response.context_data))
+            response.add_post_render_callback(
+                lambda rendered: set_page(self.page_cache_name, request, rendered, page_versions)
+            )
+        return response
@@ -1,153 +1,141 @@
-from django.core.mail import send_mail
-from django.conf import settings
 from django.utils import timezone
-from datetime import timedelta
-from django.contrib.auth.models import User
-from .models import Event, RSVP, ReminderLog, Rating
+from django.utils.timesince import timeuntil
+from datetime import datetime, timedelta
+import time
+from . import caching
+from .mailer import eligible_recipients, deliver, deliver_or_raise
+from .models import Event
+
+
+def _time_until(recipient):
+    """How long until the event starts, e.g. '2 days' or '3 hours'."""
+    start = timezone.make_aware(
+        datetime.combine(recipient['event__date'], recipient['event__time']), timezone.get_current_timezone()
+    )
+    return timeuntil(start, depth=1)
 
 
-def send_event_reminders():
-    """Send email reminders 2 days before events"""
-    # Get events happening in 2 days
-    reminder_date = timezone.now().date() + timedelta(days=2)
-    events = Event.objects.filter(date=reminder_date)
-    
-    for event in events:
-        # Get all users who RSVP'd as going
-        attendees = RSVP.objects.filter(event=event, status='going').select_related('user')
-        
-        for rsvp in attendees:
-            user = rsvp.user
-            
-            # Check if reminder already sent
-            if not ReminderLog.objects.filter(
-                event=event, 
-                user=user, 
-                reminder_type='pre_event'
-            ).exists():
-                
-                # Send email
-                subject = f'Reminder: {event.title} is in 2 days!'
-                message = f"""
-                Hi {user.first_name or user.username},
-
-                This is a friendly reminder that you have RSVP'd to attend:
-
-                Event: {event.title}
-                Date: {event.date.strftime('%B %d, %Y')}
-                Time: {event.time.strftime('%I:%M %p')}
-                Location: {event.location}
+def _render_reminder(recipient):
+    until = _time_until(recipient)
+    subject = f"Reminder: {recipient['event__title']} is in {until}!"
+    message = f"""
+                Hi {recipient['user__first_name'] or recipient['user__username']},
+
+                This is a friendly reminder that an event you have RSVP'd to starts in {until}:
+
+                Event: {recipient['event__title']}
+                Date: {recipient['event__date'].strftime('%B %d, %Y')}
+                Time: {recipient['event__time'].strftime('%I:%M %p')}
+                Location: {recipient['event__location']}
 
                 We're looking forward to seeing you there!
 
                 Best regards,
                 Event Planner Team
                 """
-                
-                try:
-                    send_mail(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@eventplanner.com',
-                        [user.email],
-                        fail_silently=False,
-                    )
-                    
-                    # Log that reminder was sent
-                    ReminderLog.objects.create(
-                        event=event,
-                        user=user,
-                        reminder_type='pre_event'
-                    )
-                    print(f"Reminder sent to {user.email} for event: {event.title}")
-                    
-                except Exception as e:
-                    print(f"Failed to send reminder to {user.email}: {str(e)}")
+    return subject, message
+
+
+def send_event_reminders(batch_size=None, workers=None):
+    """Send email reminders 2 days before events"""
+    # Get attendees of events happening in 2 days that were not reminded yet
+    reminder_date = timezone.now().date() + timedelta(days=2)
+    recipients = eligible_recipients('pre_event', date=reminder_date)
+    
+    stats = deliver(recipients, _render_reminder, 'pre_event', batch_size=batch_size, workers=workers)
+    print(f"Sent {stats['sent']} reminder(s), {stats['failed']} failed, in {stats['elapsed']:.3f}s")
+    return stats
+
+
+def remind_attendees(event_id):
+    """Send the pre-event reminder to the going attendees of one event (see events.jobs)."""
+    return deliver_or_raise(eligible_recipients('pre_event', id=event_id), _render_reminder, 'pre_event')
+
+
+def complete_due_events(now=None, chunk_size=1000):
+    """Mark every event whose auto_complete_datetime has passed as completed.
+
+    Runs set-based ``UPDATE ... WHERE auto_complete_datetime <= now AND
+    is_completed = false`` statements over bounded primary-key chunks, so no
+    model instances are loaded and no single statement holds locks for long.
+    Returns a dict with the completed count, number of chunks and elapsed seconds.
+    """
+    now = now or timezone.now()
+    started = time.perf_counter()
+    due = Event.objects.filter(auto_complete_datetime__lte=now, is_completed=False)
+
+    completed = chunks = 0
+    while True:
+        ids = list(due.order_by('auto_complete_datetime').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        completed += due.filter(pk__in=ids).update(is_completed=True, updated_at=now)
+        # Bulk UPDATE sends no signals: invalidate cached pages for these events directly
+        caching.touch(ids, listing=True)
+        chunks += 1
+
+    return {
+        'completed': completed,
+        'chunks': chunks,
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def complete_event(event_id, now=None):
+    """Mark one event completed if its auto_complete_datetime has passed (see events.jobs)."""
+    now = now or timezone.now()
+    completed = Event.objects.filter(
+        pk=event_id, is_completed=False, auto_complete_datetime__lte=now
+    ).update(is_completed=True, updated_at=now)
+    if completed:
+        caching.touch([event_id], listing=True)
+    return completed
 
 
 def auto_complete_events():
     """Automatically mark events as completed based on auto_complete_datetime"""
-    now = timezone.now()
-    
-    # Find events that should be auto-completed
-    events_to_complete = Event.objects.filter(
-        auto_complete_datetime__lte=now,
-        is_completed=False
-    )
+    stats = complete_due_events()
     
-    completed_count = 0
-    
-    for event in events_to_complete:
-        event.is_completed = True
-        event.save()
-        completed_count += 1
-        print(f"Event '{event.title}' (ID: {event.pk}) marked as completed automatically")
-    
-    if completed_count > 0:
-        print(f"Successfully auto-completed {completed_count} event(s)")
+    if stats['completed'] > 0:
+        print(f"Successfully auto-completed {stats['completed']} event(s) "
+              f"in {stats['chunks']} chunk(s), {stats['elapsed']:.3f}s")
     else:
         print("No events were auto-completed")
 
 
-def send_rating_requests():
-    """Send rating request emails after events end"""
-    # Get events that ended yesterday
-    yesterday = timezone.now().date() - timedelta(days=1)
-    events = Event.objects.filter(date=yesterday)
-    
-    for event in events:
-        # Get all users who attended (RSVP'd as going)
-        attendees = RSVP.objects.filter(event=event, status='going').select_related('user')
-        
-        for rsvp in attendees:
-            user = rsvp.user
-            
-            # Check if rating request already sent
-            if not ReminderLog.objects.filter(
-                event=event, 
-                user=user, 
-                reminder_type='post_event'
-            ).exists():
-                
-                # Check if user hasn't already rated
-                if not Rating.objects.filter(event=event, user=user).exists():
-                    
-                    # Send email
-                    subject = f'How was {event.title}? Please rate your experience!'
-                    message = f"""
-                    Hi {user.first_name or user.username},
-
-                    Thank you for attending {event.title} yesterday!
+def _render_rating_request(recipient):
+    subject = f"How was {recipient['event__title']}? Please rate your experience!"
+    message = f"""
+                    Hi {recipient['user__first_name'] or recipient['user__username']},
+
+                    Thank you for attending {recipient['event__title']}!
 
                     We hope you had a great time. Please take a moment to rate your experience and help other users discover great events.
 
-                    You can rate the event by visiting: http://localhost:8000/event/{event.id}/
+                    You can rate the event by visiting: http://localhost:8000/event/{recipient['event_id']}/
 
                     Your feedback is valuable to us and helps event organizers improve future events.
 
                     Best regards,
                     Event Planner Team
                     """
-                    
-                    try:
-                        send_mail(
-                            subject,
-                            message,
-                            settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@eventplanner.com',
-                            [user.email],
-                            fail_silently=False,
-                        )
-                        
-                        # Log that rating request was sent
-                        ReminderLog.objects.create(
-                            event=event,
-                            user=user,
-                            reminder_type='post_event'
-                        )
-                        print(f"Rating request sent to {user.email} for event: {event.title}")
-                        
-                    except Exception as e:
-                        print(f"Failed to send rating request to {user.email}: {str(e)}")
+    return subject, message
+
+
+def send_rating_requests(batch_size=None, workers=None):
+    """Send rating request emails after events end"""
+    # Get attendees of events that ended yesterday who were not asked and have not rated
+    yesterday = timezone.now().date() - timedelta(days=1)
+    recipients = eligible_recipients('post_event', date=yesterday)
+    
+    stats = deliver(recipients, _render_rating_request, 'post_event', batch_size=batch_size, workers=workers)
+    print(f"Sent {stats['sent']} rating request(s), {stats['failed']} failed, in {stats['elapsed']:.3f}s")
+    return stats
+
+
+def request_ratings(event_id):
+    """Ask the going attendees of one event to rate it (see events.jobs)."""
+    return deliver_or_raise(eligible_recipients('post_event', id=event_id), _render_rating_request, 'post_event')
 
 
 def test_send_reminder():
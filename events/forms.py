@@ -31,6 +31,12 @@ class EventForm(forms.ModelForm):
 
 
 class RSVPForm(forms.ModelForm):
+    # Users pick going/not going; the waitlist is assigned by events.services
+    status = forms.ChoiceField(
+        choices=[('going', 'Going'), ('not_going', 'Not Going')],
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
     class Meta:
         model = RSVP
         fields = ['status']
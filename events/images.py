@@ -0,0 +1,192 @@
+"""Background image renditions for uploaded event images and avatars.
+
+Saving a model only records that its image changed (an ``ImageJob`` row);
+``manage.py process_image_jobs`` drains the queue outside the request and
+writes fixed-size WebP and JPEG renditions next to the original. Rendition
+names embed the content hash of the original, so re-uploading identical bytes
+reuses the existing files and unchanged images are never reprocessed.
+
+Models opt in with a ``RENDITIONS`` mapping of ``{field: {name: (width,
+height, crop)}}`` plus ``<field>_hash`` and ``<field>_renditions`` columns.
+"""
+import hashlib
+from datetime import timedelta
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+
+RENDITION_DIR = 'renditions'
+FORMATS = (('webp', 'WEBP', {'quality': 80, 'method': 4}), ('jpeg', 'JPEG', {'quality': 85, 'optimize': True}))
+MAX_ATTEMPTS = 3
+# A running job whose worker has not finished after this long is handed out again
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def state_fields(field_name):
+    """Columns holding the content hash and rendition paths for ``field_name``."""
+    return f'{field_name}_hash', f'{field_name}_renditions'
+
+
+def is_default(instance, field_name):
+    field = instance._meta.get_field(field_name)
+    return getattr(instance, field_name).name == field.default
+
+
+def reset(instance, field_name):
+    """Forget renditions of a replaced image so templates fall back to the original."""
+    hash_field, renditions_field = state_fields(field_name)
+    setattr(instance, hash_field, '')
+    setattr(instance, renditions_field, {})
+
+
+def enqueue(instance, field_name):
+    """Queue rendition work for ``instance.<field_name>`` (at most one pending job per image)."""
+    if not getattr(instance, field_name) or is_default(instance, field_name):
+        return
+    ImageJob = apps.get_model('events', 'ImageJob')
+    ImageJob.objects.bulk_create([
+        ImageJob(model_label=instance._meta.label, object_id=instance.pk, field_name=field_name)
+    ], ignore_conflicts=True)
+
+
+def rendition(instance, field_name, name):
+    """Return ``{'webp': path, 'jpeg': path, 'width': w, 'height': h}`` or None."""
+    return (getattr(instance, state_fields(field_name)[1]) or {}).get(name)
+
+
+def content_hash(field_file):
+    digest = hashlib.sha256()
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _resize(img, size, crop):
+    from PIL import Image, ImageOps
+
+    if crop:
+        return ImageOps.fit(img, size, Image.LANCZOS)
+    resized = img.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    return resized
+
+
+def _flatten(img):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    from PIL import Image
+
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def build_renditions(field_file, digest, spec):
+    """Write every rendition in ``spec`` for ``field_file`` and return their paths."""
+    # Pillow is imported only here, in the worker, so web processes start without it
+    from PIL import Image, ImageOps
+
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as f:
+        img = ImageOps.exif_transpose(Image.open(f))
+        img.load()
+
+    renditions = {}
+    for name, (width, height, crop) in spec.items():
+        resized = _resize(img, (width, height), crop)
+        entry = {'width': resized.width, 'height': resized.height}
+        for ext, pil_format, options in FORMATS:
+            path = f"{RENDITION_DIR}/{digest[:16]}-{width}x{height}{'c' if crop else ''}.{ext}"
+            if not storage.exists(path):
+                buffer = BytesIO()
+                out = resized if ext == 'webp' else _flatten(resized)
+                out.save(buffer, pil_format, **options)
+                path = storage.save(path, ContentFile(buffer.getvalue()))
+            entry[ext] = path
+        renditions[name] = entry
+    return renditions
+
+
+def process(job):
+    """Generate renditions for one job. Returns 'processed', 'unchanged' or 'skipped'."""
+    model = apps.get_model(job.model_label)
+    instance = model._default_manager.filter(pk=job.object_id).first()
+    if instance is None:
+        return 'skipped'
+    field_file = getattr(instance, job.field_name)
+    if not field_file or is_default(instance, job.field_name):
+        return 'skipped'
+
+    hash_field, renditions_field = state_fields(job.field_name)
+    digest = content_hash(field_file)
+    if digest == getattr(instance, hash_field) and getattr(instance, renditions_field):
+        return 'unchanged'
+
+    renditions = build_renditions(field_file, digest, model.RENDITIONS[job.field_name])
+    # Only record them if the image was not replaced while we were working
+    updated = model._default_manager.filter(pk=instance.pk, **{job.field_name: field_file.name}).update(
+        **{hash_field: digest, renditions_field: renditions}
+    )
+    # update() sends no signals; let the model invalidate whatever shows the image
+    if updated and hasattr(model, 'renditions_changed'):
+        model.renditions_changed(instance.pk)
+    return 'processed'
+
+
+def reclaim_stale(now):
+    """Return jobs abandoned by a crashed worker to the queue, or fail them once out of attempts."""
+    ImageJob = apps.get_model('events', 'ImageJob')
+    for job in ImageJob.objects.filter(status='running', updated_at__lt=now - LOCK_TIMEOUT):
+        _fail(job, TimeoutError(f'worker did not finish within {LOCK_TIMEOUT}'))
+
+
+def claim(limit):
+    """Mark up to ``limit`` pending jobs as running and return them, oldest first.
+
+    Each job is claimed with a conditional UPDATE so concurrent workers never
+    process the same job twice. ``updated_at`` records the claim time for
+    :func:`reclaim_stale`.
+    """
+    ImageJob = apps.get_model('events', 'ImageJob')
+    pending = ImageJob.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in list(pending)
+        if ImageJob.objects.filter(pk=pk, status='pending').update(
+            status='running', attempts=F('attempts') + 1, updated_at=timezone.now()
+        )
+    ]
+    return list(ImageJob.objects.filter(pk__in=claimed).order_by('pk'))
+
+
+def run(limit=100):
+    """Process one batch of jobs and return per-outcome counts."""
+    reclaim_stale(timezone.now())
+    stats = {'processed': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    for job in claim(limit):
+        try:
+            outcome = process(job)
+        except Exception as e:
+            stats['failed'] += 1
+            _fail(job, e)
+            continue
+        stats[outcome] += 1
+        job.delete()
+    return stats
+
+
+def _fail(job, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    job.status = 'failed' if job.attempts >= MAX_ATTEMPTS else 'pending'
+    try:
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+    except IntegrityError:
+        # A newer job for the same image is already pending
+        job.delete()
@@ -0,0 +1,131 @@
+"""Due-time jobs for events: reminders, rating requests and auto-completion.
+
+Saving an event with a new schedule replaces its pending ``EventJob`` rows:
+a reminder ``EVENT_REMINDER_LEAD_HOURS`` (default 48) before the start, a
+rating request at ``end_datetime`` and an auto-complete job at
+``auto_complete_datetime``. ``manage.py process_jobs`` claims due jobs in
+``due_at`` order and runs them, so work is spread over the day and each job
+runs within one poll interval of its due time. Several workers can run side
+by side; failures are retried with exponential backoff.
+"""
+import uuid
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(minutes=1)
+# A running job whose worker has not finished after this long counts as a failed attempt
+LOCK_TIMEOUT = timedelta(minutes=10)
+# Rating requests for events that ended longer ago than this are not scheduled
+RATING_WINDOW = timedelta(days=1)
+
+# Job kind -> function in events.cron called with the event id
+HANDLERS = {
+    'event_reminder': 'remind_attendees',
+    'rating_request': 'request_ratings',
+    'auto_complete': 'complete_event',
+}
+
+
+def _model():
+    return apps.get_model('events', 'EventJob')
+
+
+def handler(kind):
+    from . import cron  # cron imports the models, which import this module
+    return getattr(cron, HANDLERS[kind])
+
+
+def reminder_lead():
+    return timedelta(hours=getattr(settings, 'EVENT_REMINDER_LEAD_HOURS', 48))
+
+
+def due_times(event, now):
+    """``{kind: due_at}`` for the jobs ``event`` needs from ``now`` on."""
+    due = {}
+    start = event.start_datetime
+    if start and start > now:
+        due['event_reminder'] = max(start - reminder_lead(), now)
+    if event.end_datetime and event.end_datetime > now - RATING_WINDOW:
+        due['rating_request'] = event.end_datetime
+    if event.auto_complete_datetime and not event.is_completed:
+        due['auto_complete'] = event.auto_complete_datetime
+    return due
+
+
+def schedule(event, created=False, now=None):
+    """Replace the pending jobs of ``event`` with ones matching its current schedule."""
+    EventJob = _model()
+    if not created:
+        EventJob.objects.filter(event_id=event.pk, status='pending').delete()
+    EventJob.objects.bulk_create([
+        EventJob(event_id=event.pk, kind=kind, due_at=due_at)
+        for kind, due_at in due_times(event, now or timezone.now()).items()
+    ])
+
+
+def reclaim_stale(now):
+    """Retry jobs abandoned by a crashed or hung worker with backoff, or fail them once out of attempts."""
+    EventJob = _model()
+    for job in EventJob.objects.filter(status='running', locked_at__lt=now - LOCK_TIMEOUT):
+        _fail(job, TimeoutError(f'worker did not finish within {LOCK_TIMEOUT}'))
+
+
+def claim(limit, now=None):
+    """Mark up to ``limit`` due jobs as running and return them, earliest first.
+
+    Uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database has it, so
+    concurrent workers pass over each other's rows instead of waiting. SQLite
+    serializes writers, so there a single ``UPDATE ... WHERE id IN (SELECT ...
+    LIMIT n)`` hands each job to exactly one worker.
+    """
+    EventJob = _model()
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    due = EventJob.objects.filter(status='pending', due_at__lte=now).order_by('due_at', 'pk')
+    claimed = {'status': 'running', 'locked_by': token, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            EventJob.objects.filter(pk__in=ids).update(**claimed)
+    else:
+        EventJob.objects.filter(pk__in=due.values('pk')[:limit]).update(**claimed)
+    return list(EventJob.objects.filter(locked_by=token, status='running').order_by('due_at', 'pk'))
+
+
+def run(limit=100, now=None):
+    """Run one batch of due jobs and return per-outcome counts."""
+    now = now or timezone.now()
+    reclaim_stale(now)
+    stats = {'done': 0, 'retried': 0, 'failed': 0}
+    for job in claim(limit, now):
+        try:
+            handler(job.kind)(job.event_id)
+        except Exception as e:
+            stats[_fail(job, e)] += 1
+            continue
+        stats['done'] += 1
+        job.delete()
+    return stats
+
+
+def _fail(job, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts >= MAX_ATTEMPTS:
+        job.status = 'failed'
+    else:
+        job.status = 'pending'
+        job.due_at = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+    try:
+        job.save(update_fields=['status', 'due_at', 'last_error', 'updated_at'])
+    except IntegrityError:
+        # The event was rescheduled meanwhile; the newer job replaces this one
+        job.delete()
+    return 'failed' if job.status == 'failed' else 'retried'
@@ -0,0 +1,104 @@
+"""Batched mail pipeline for event reminders and rating requests.
+
+Recipients are selected with one anti-join query per run, messages are
+rendered up front and sent over one reused connection per batch
+(``get_connection().send_messages``), batches are spread over a small thread
+pool, and the resulting ``ReminderLog`` rows are written with ``bulk_create``.
+
+Tunable from settings:
+
+- ``EVENT_MAIL_BATCH_SIZE``: messages per SMTP connection (default 100)
+- ``EVENT_MAIL_WORKERS``: concurrent connections (default 4)
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+
+from .models import RSVP, Rating, ReminderLog
+
+
+class DeliveryError(Exception):
+    """Some messages of a job's delivery could not be sent."""
+
+
+RECIPIENT_FIELDS = (
+    'event_id', 'event__title', 'event__date', 'event__time', 'event__location',
+    'user_id', 'user__email', 'user__first_name', 'user__username',
+)
+
+
+def eligible_recipients(reminder_type, **event_filter):
+    """Going attendees of the matching events that have not received ``reminder_type`` yet."""
+    already_sent = ReminderLog.objects.filter(
+        event=OuterRef('event'), user=OuterRef('user'), reminder_type=reminder_type
+    )
+    recipients = (
+        RSVP.objects.filter(status='going', **{f'event__{k}': v for k, v in event_filter.items()})
+        .exclude(user__email='')
+        .filter(~Exists(already_sent))
+    )
+    if reminder_type == 'post_event':
+        recipients = recipients.filter(
+            ~Exists(Rating.objects.filter(event=OuterRef('event'), user=OuterRef('user')))
+        )
+    return recipients.order_by('event_id', 'user_id').values(*RECIPIENT_FIELDS)
+
+
+def _send_batch(batch):
+    """Send ``[(recipient, message), ...]`` over one connection; return the recipients sent."""
+    connection = get_connection(fail_silently=False)
+    connection.send_messages([message for _, message in batch])
+    return [recipient for recipient, _ in batch]
+
+
+def deliver(recipients, render, reminder_type, batch_size=None, workers=None):
+    """Render, send and log ``reminder_type`` mail for ``recipients``.
+
+    ``render`` maps a recipient row to ``(subject, body)``. Returns a dict
+    with ``sent``, ``failed``, ``error`` (the last send error, or None) and
+    ``elapsed`` (seconds).
+    """
+    batch_size = batch_size or getattr(settings, 'EVENT_MAIL_BATCH_SIZE', 100)
+    workers = workers or getattr(settings, 'EVENT_MAIL_WORKERS', 4)
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None) or 'noreply@eventplanner.com'
+    started = time.perf_counter()
+
+    messages = []
+    for recipient in recipients:
+        subject, body = render(recipient)
+        messages.append((recipient, EmailMessage(subject, body, from_email, [recipient['user__email']])))
+    batches = [messages[i:i + batch_size] for i in range(0, len(messages), batch_size)]
+
+    sent, failed, error = [], 0, None
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        futures = [(batch, pool.submit(_send_batch, batch)) for batch in batches]
+        for batch, future in futures:
+            try:
+                sent.extend(future.result())
+            except Exception as e:
+                # Unlogged recipients are picked up again by the next run
+                failed += len(batch)
+                error = f'{type(e).__name__}: {e}'
+                print(f"Failed to send {len(batch)} {reminder_type} message(s): {str(e)}")
+
+    ReminderLog.objects.bulk_create(
+        [ReminderLog(event_id=r['event_id'], user_id=r['user_id'], reminder_type=reminder_type) for r in sent],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return {'sent': len(sent), 'failed': failed, 'error': error, 'elapsed': time.perf_counter() - started}
+
+
+def deliver_or_raise(recipients, render, reminder_type):
+    """``deliver()`` for job handlers: raise ``DeliveryError`` if any message failed.
+
+    The messages that did go out are logged first, so the job's retry only
+    reaches the recipients that were missed.
+    """
+    stats = deliver(recipients, render, reminder_type)
+    if stats['failed']:
+        raise DeliveryError(f"{stats['failed']} {reminder_type} message(s) not sent ({stats['error']})")
+    return stats
@@ -0,0 +1,36 @@
+"""Server entry points for ``bench_asgi --db-latency``.
+
+Each adds ``BENCH_DB_LATENCY_MS`` of sleep before every SQL statement, standing
+in for the network round trip to a remote database. The sleep blocks the
+thread that runs the query, exactly as a slow database would.
+"""
+import os
+import time
+
+
+def _add_db_latency():
+    from django.db.backends.signals import connection_created
+
+    delay = float(os.environ.get('BENCH_DB_LATENCY_MS', 0)) / 1000
+
+    def slow_execute(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        # At the front: execute_wrapper() blocks open around this pop the last entry on exit
+        connection.execute_wrappers.insert(0, slow_execute)
+
+    connection_created.connect(install, weak=False)
+
+
+def asgi_application():
+    from EventPlanner.asgi import application
+    _add_db_latency()
+    return application
+
+
+def wsgi_application():
+    from EventPlanner.wsgi import application
+    _add_db_latency()
+    return application
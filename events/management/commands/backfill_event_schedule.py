@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events import schedule
+
+
+class Command(BaseCommand):
+    help = 'Recompute stale end_datetime / auto_complete_datetime values in short primary-key chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=schedule.BACKFILL_CHUNK_SIZE)
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between chunks')
+
+    def handle(self, *args, **options):
+        total = 0
+        for last_id, updated in schedule.backfill(chunk_size=options['chunk_size']):
+            total += updated
+            if updated:
+                self.stdout.write(f'up to id {last_id}: {updated} updated')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'Backfilled the schedule of {total} event(s)'))
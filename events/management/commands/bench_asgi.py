@@ -0,0 +1,197 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time as time_mod
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from events.models import Event
+from .bench_routes import percentile
+
+
+LATENCY_MODULE = 'events.management.commands._latency'
+
+SERVERS = {
+    # name: (module that must be importable, command line)
+    'asgi': ('uvicorn', lambda o, port: [
+        sys.executable, '-m', 'uvicorn',
+        *([f'{LATENCY_MODULE}:asgi_application', '--factory'] if o['db_latency'] else ['EventPlanner.asgi:application']),
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(o['workers']),
+        '--log-level', 'warning', '--no-access-log',
+    ]),
+    'wsgi': ('gunicorn', lambda o, port: [
+        sys.executable, '-m', 'gunicorn',
+        f'{LATENCY_MODULE}:wsgi_application()' if o['db_latency'] else 'EventPlanner.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(o['workers']),
+        '--worker-class', 'gthread', '--threads', str(o['threads']), '--log-level', 'warning',
+    ]),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the calendar feed and event JSON endpoints with many concurrent clients, '
+        'served by uvicorn (ASGI) and by gunicorn (WSGI, gthread workers)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='asgi,wsgi', help='Comma-separated: asgi, wsgi')
+        parser.add_argument('--clients', type=int, default=1000, help='Concurrent keep-alive connections')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per server')
+        parser.add_argument('--workers', type=int, default=4, help='Server worker processes')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per gunicorn worker')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Milliseconds added to every SQL statement in the servers, simulating a remote database'
+        )
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        event = Event.objects.order_by('-going_count', 'pk').first()
+        if event is None:
+            raise CommandError('No events; run generate_data first')
+        today = timezone.now().date()
+        paths = [
+            f"{reverse('calendar-events-api')}?start={today}&end={today + timedelta(days=31)}",
+            f"{reverse('api-v1-event', args=[event.pk])}?include=counts,viewer",
+        ]
+
+        results = {}
+        for name in [s for s in options['servers'].split(',') if s]:
+            if name not in SERVERS:
+                raise CommandError(f'Unknown server {name!r}')
+            module, command = SERVERS[name]
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f'{name} needs {module}: pip install {module}')
+            with self._server(command(options, options['port']), options['port'], options['db_latency']):
+                results[name] = asyncio.run(self._load(options['port'], paths, options['clients'], options['duration']))
+            result = results[name]
+            self.stdout.write(
+                f"{name}: {result['requests']} requests, {result['rps']:.0f} req/s, "
+                f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms p99={result['p99_ms']:.1f}ms, "
+                f"{result['errors']} errors"
+            )
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'clients': options['clients'], 'duration': options['duration'],
+                    'workers': options['workers'], 'threads': options['threads'], 'db_latency_ms': options['db_latency'],
+                    'database': settings.DATABASES['default']['ENGINE'], 'cpus': os.cpu_count(), 'paths': paths,
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    @contextmanager
+    def _server(self, command, port, db_latency):
+        # DEBUG would keep every query in memory for the whole run
+        env = {**os.environ, 'DEBUG': 'False', 'BENCH_DB_LATENCY_MS': str(db_latency)}
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            self._wait_for_port(process, port)
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _wait_for_port(self, process, port, timeout=30):
+        deadline = time_mod.monotonic() + timeout
+        while time_mod.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Server exited with status {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time_mod.sleep(0.2)
+        raise CommandError(f'Server did not listen on port {port} within {timeout}s')
+
+    async def _load(self, port, paths, clients, duration):
+        # Warm every worker's connection and URL resolver before timing
+        await asyncio.gather(*[self._client(port, paths, time_mod.perf_counter() + 1, [], []) for _ in range(16)])
+
+        latencies, errors = [], []
+        started = time_mod.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[self._client(port, paths, deadline, latencies, errors, offset=i) for i in range(clients)])
+        elapsed = time_mod.perf_counter() - started
+
+        latencies.sort()
+        if not latencies:
+            raise CommandError(f'No request completed ({len(errors)} errors)')
+        return {
+            'requests': len(latencies),
+            'errors': len(errors),
+            'rps': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+
+    async def _client(self, port, paths, deadline, latencies, errors, offset=0):
+        """One keep-alive HTTP/1.1 connection issuing GETs back to back until ``deadline``."""
+        reader = writer = None
+        i = offset
+        while time_mod.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                sent = time_mod.perf_counter()
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+                await writer.drain()
+                status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout=60)
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                errors.append(type(e).__name__)
+                writer = _close(writer)
+                continue
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(time_mod.perf_counter() - sent)
+            if not keep_alive:
+                writer = _close(writer)
+        _close(writer)
+
+
+async def _read_response(reader):
+    """Read one response; return ``(status, keep_alive)``."""
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split()[1])
+    headers = {}
+    for line in head[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    return status, headers.get('connection') != 'close'
+
+
+def _close(writer):
+    if writer is not None:
+        writer.close()
+    return None
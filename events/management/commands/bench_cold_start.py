@@ -0,0 +1,76 @@
+import json
+import os
+import subprocess
+import sys
+import time as time_mod
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_routes import percentile
+
+
+# Runs in a fresh interpreter: everything a serverless cold start does, timed
+CHILD = r'''
+import io, json, sys, time
+started = time.perf_counter()
+import EventPlanner.wsgi
+imported = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True,
+    'wsgi.run_once': False,
+}
+status = []
+body = b''.join(EventPlanner.wsgi.application(environ, lambda s, h, e=None: status.append(s)))
+served = time.perf_counter()
+print(json.dumps({
+    'status': status[0], 'import_s': imported - started, 'first_response_s': served - started,
+    'modules': len(sys.modules), 'pil_loaded': 'PIL' in sys.modules,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure cold starts: time from importing EventPlanner.wsgi to the first served response, in fresh processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help='Fresh processes to start')
+        parser.add_argument('--path', default='/', help='Path of the first request')
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        # DEBUG keeps every query and renders the debug 404 page; production cold starts run without it
+        env = {**os.environ, 'DEBUG': 'False', 'ALLOWED_HOSTS': 'localhost'}
+        samples = []
+        for _ in range(options['repeat']):
+            started = time_mod.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', CHILD, options['path']],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            elapsed = time_mod.perf_counter() - started
+            if result.returncode:
+                raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'child failed')
+            sample = json.loads(result.stdout.strip().splitlines()[-1])
+            sample['process_s'] = elapsed
+            samples.append(sample)
+
+        report = {'path': options['path'], 'status': samples[0]['status'], 'pil_loaded': samples[0]['pil_loaded'],
+                  'modules': samples[0]['modules']}
+        for key in ('import_s', 'first_response_s', 'process_s'):
+            ordered = sorted(s[key] for s in samples)
+            report[key.replace('_s', '_ms')] = {
+                'p50': percentile(ordered, 0.5) * 1000, 'p95': percentile(ordered, 0.95) * 1000,
+            }
+        self.stdout.write(
+            f"{options['path']} -> {report['status']}: import {report['import_ms']['p50']:.0f}ms, "
+            f"first response {report['first_response_ms']['p50']:.0f}ms "
+            f"(p95 {report['first_response_ms']['p95']:.0f}ms), whole process {report['process_ms']['p50']:.0f}ms; "
+            f"{report['modules']} modules, PIL {'loaded' if report['pil_loaded'] else 'not loaded'}"
+        )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'samples': samples, 'summary': report}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
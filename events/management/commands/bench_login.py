@@ -0,0 +1,76 @@
+import time as time_mod
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .bench_routes import percentile
+
+
+FAST_HASHER = 'django.contrib.auth.hashers.MD5PasswordHasher'
+
+
+def legacy_save_profile(sender, instance, **kwargs):
+    """The old receiver: re-save the profile on every User save, last_login included."""
+    instance.profile.save()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput with the old always-save profile signal and the change-aware one (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=300, help='Logins per mode')
+        parser.add_argument(
+            '--real-hasher', action='store_true',
+            help='Keep the configured password hasher (by default a fast one, so hashing does not hide the difference)'
+        )
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': [FAST_HASHER]}
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['*'], **hashers):
+                User.objects.create_user('bench-login', 'bench-login@example.com', 'bench-password')
+                for label, legacy in (('always-save signal', True), ('change-aware signal', False)):
+                    if legacy:
+                        post_save.connect(legacy_save_profile, sender=User)
+                    try:
+                        self._run(label, options['repeat'])
+                    finally:
+                        post_save.disconnect(legacy_save_profile, sender=User)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, label, repeat):
+        client = Client()
+        credentials = {'username': 'bench-login', 'password': 'bench-password'}
+        url = reverse('login')
+        # Warm up, and count the statements of one login
+        with CaptureQueriesContext(connection) as captured:
+            client.post(url, credentials)
+        queries = len(captured)
+        profile_queries = sum('accounts_profile' in q['sql'] for q in captured.captured_queries)
+
+        timings = []
+        for _ in range(repeat):
+            client.cookies.clear()
+            sid = transaction.savepoint()
+            started = time_mod.perf_counter()
+            response = client.post(url, credentials)
+            timings.append(time_mod.perf_counter() - started)
+            transaction.savepoint_rollback(sid)
+            assert response.status_code == 302, response.status_code
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{label:<20} {len(timings) / sum(timings):8.0f} logins/s  '
+            f'p50={percentile(timings, 0.5) * 1000:.2f}ms p95={percentile(timings, 0.95) * 1000:.2f}ms  '
+            f'{queries} queries ({profile_queries} on accounts_profile)'
+        ))
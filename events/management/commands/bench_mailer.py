@@ -0,0 +1,58 @@
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from events.cron import send_event_reminders
+from events.models import Event, RSVP
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the reminder mail pipeline against the locmem email backend (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attendees', type=int, default=5000)
+        parser.add_argument('--batch-sizes', default='1,50,200', help='Comma-separated batch sizes to compare')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+                event = self._seed(options['attendees'])
+                for batch_size in [int(b) for b in options['batch_sizes'].split(',')]:
+                    self._run(event, batch_size, options['workers'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, count):
+        creator = User.objects.create(username='bench-mailer-creator')
+        event = Event.objects.create(
+            title='Mailer benchmark', description='-', location='-', creator=creator,
+            date=timezone.now().date() + timedelta(days=2), time=time(18, 0),
+        )
+        users = User.objects.bulk_create(
+            [User(username=f'bench-mailer-{i}', email=f'bench{i}@example.com') for i in range(count)],
+            batch_size=1000,
+        )
+        RSVP.objects.bulk_create([RSVP(event=event, user=u, status='going') for u in users], batch_size=1000)
+        return event
+
+    def _run(self, event, batch_size, workers):
+        sid = transaction.savepoint()
+        mail.outbox = []
+        with CaptureQueriesContext(connection) as queries:
+            stats = send_event_reminders(batch_size=batch_size, workers=workers)
+        transaction.savepoint_rollback(sid)
+        self.stdout.write(self.style.SUCCESS(
+            f"batch_size={batch_size:<5} workers={workers}: sent={stats['sent']} "
+            f"outbox={len(mail.outbox)} queries={len(queries)} elapsed={stats['elapsed']:.3f}s"
+        ))
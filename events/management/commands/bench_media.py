@@ -0,0 +1,78 @@
+import os
+import time as time_mod
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import FileResponse, Http404
+from django.test import RequestFactory
+from django.views import View
+
+from EventPlanner.views import MediaServeView
+
+
+class LegacyMediaServeView(View):
+    """The pre-caching MediaServeView, kept for comparison."""
+
+    def get(self, request, path):
+        return legacy_media_get(request, path)
+
+
+def legacy_media_get(request, path):
+    remapped_path = MediaServeView.LEGACY_MAP.get(path, path)
+    candidate_roots = []
+    if getattr(settings, 'MEDIA_ROOT', None):
+        candidate_roots.append(settings.MEDIA_ROOT)
+    env_media_root = os.environ.get('MEDIA_ROOT')
+    if env_media_root:
+        candidate_roots.append(env_media_root)
+    candidate_roots.append('/tmp/media')
+    base_dir = getattr(settings, 'BASE_DIR', None)
+    if base_dir:
+        candidate_roots.append(os.path.join(str(base_dir), 'media'))
+    for root in candidate_roots:
+        file_path = os.path.join(root, remapped_path)
+        if os.path.exists(file_path) and os.path.isfile(file_path):
+            return FileResponse(open(file_path, 'rb'))
+    if remapped_path != path:
+        for root in candidate_roots:
+            original_file_path = os.path.join(root, path)
+            if os.path.exists(original_file_path) and os.path.isfile(original_file_path):
+                return FileResponse(open(original_file_path, 'rb'))
+    raise Http404("Media file not found")
+
+
+class Command(BaseCommand):
+    help = 'Measure media requests per second for the old and the cached MediaServeView'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='default.jpg', help='Media path to request (default: legacy avatar path)')
+        parser.add_argument('--seconds', type=float, default=2.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        path, seconds = options['path'], options['seconds']
+        factory = RequestFactory()
+        view = MediaServeView.as_view()
+        legacy = LegacyMediaServeView.as_view()
+
+        plain = factory.get(f'/media/{path}')
+        first = view(plain, path=path)
+        b''.join(first.streaming_content)
+        conditional = factory.get(f'/media/{path}', headers={'If-None-Match': first['ETag']})
+
+        runs = [
+            ('legacy full GET', lambda: legacy(plain, path=path)),
+            ('cached full GET', lambda: view(plain, path=path)),
+            ('cached 304 revalidation', lambda: view(conditional, path=path)),
+        ]
+        for label, fetch in runs:
+            self.stdout.write(f'{label:<26} {self._rps(fetch, seconds):10.0f} req/s')
+
+    def _rps(self, fetch, seconds):
+        count, started = 0, time_mod.perf_counter()
+        while time_mod.perf_counter() - started < seconds:
+            response = fetch()
+            if response.streaming:
+                b''.join(response.streaming_content)
+            response.close()
+            count += 1
+        return count / (time_mod.perf_counter() - started)
@@ -0,0 +1,79 @@
+import statistics
+import time as time_mod
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils import timezone
+
+from events.models import Event
+from events.pagination import KeysetPaginator
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare offset and keyset pagination of the event list at deep pages (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='1,100,10000', help='Comma-separated page numbers')
+        parser.add_argument('--per-page', type=int, default=6)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        pages = sorted(int(p) for p in options['pages'].split(','))
+        per_page = options['per_page']
+        try:
+            with transaction.atomic():
+                creator = User.objects.create(username='bench-pagination-creator')
+                self._seed(creator, pages[-1] * per_page + per_page)
+                queryset = Event.objects.select_related('creator').order_by('date', 'time', 'id')
+                for number in pages:
+                    offset = self._time(lambda: list(Paginator(queryset, per_page).page(number)), options['repeat'])
+                    cursor = self._cursor_for(queryset, per_page, number)
+                    keyset = self._time(
+                        lambda: list(KeysetPaginator(queryset, per_page).page(cursor)), options['repeat']
+                    )
+                    self.stdout.write(
+                        f'page {number:>6}  offset={offset * 1000:8.2f}ms  keyset={keyset * 1000:8.2f}ms'
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _cursor_for(self, queryset, per_page, number):
+        # The cursor a client would hold after following "Next" number - 1 times
+        if number == 1:
+            return None
+        paginator = KeysetPaginator(queryset, per_page)
+        last = queryset[(number - 1) * per_page - 1]
+        return paginator.encode_cursor(last)
+
+    def _time(self, fetch, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time_mod.perf_counter()
+            fetch()
+            samples.append(time_mod.perf_counter() - started)
+        return statistics.median(samples)
+
+    def _seed(self, creator, count):
+        today = timezone.now().date()
+        batch = []
+        for i in range(count):
+            batch.append(Event(
+                title=f'Event {i}',
+                description='Benchmark event',
+                location='Main hall',
+                date=today + timedelta(days=i % 730),
+                time=time(8 + i % 12, 0),
+                creator=creator,
+            ))
+            if len(batch) == 5000:
+                Event.objects.bulk_create(batch)
+                batch = []
+        Event.objects.bulk_create(batch)
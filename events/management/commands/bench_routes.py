@@ -0,0 +1,172 @@
+import json
+import platform
+import time as time_mod
+from contextlib import redirect_stdout
+from io import StringIO
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from events import jobs
+from events.cron import complete_due_events, send_event_reminders, send_rating_requests
+from events.models import Event, RSVP, Rating, ReminderLog
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main routes and cron jobs against the current database '
+        '(see generate_data) and report p50/p95/p99 latency and query counts; writes are rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Timed samples per scenario')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', default='', help='Comma-separated scenario names to run')
+        parser.add_argument('--user', help='Username to sign in as (default: the user with the most RSVPs)')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every sample')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p95 slowdown flagged as a regression')
+
+    def handle(self, *args, **options):
+        self.options = options
+        user = self._user(options['user'])
+        upcoming = (
+            Event.objects.filter(is_completed=False, date__gt=timezone.now().date())
+            .order_by('-going_count', 'pk').first()
+        )
+        if upcoming is None:
+            raise CommandError('No upcoming events; run generate_data first')
+        search = upcoming.title.split()[0]
+
+        self.client = Client()
+        self.client.force_login(user)
+        only = {name for name in options['only'].split(',') if name}
+        scenarios = [
+            ('events-home', False, lambda: self._get(reverse('events-home'))),
+            ('events-home-search', False, lambda: self._get(reverse('events-home'), {'search': search})),
+            ('event-detail', False, lambda: self._get(reverse('event-detail', args=[upcoming.pk]))),
+            ('completed-events', False, lambda: self._get(reverse('completed-events'))),
+            ('my-rsvps', False, lambda: self._get(reverse('my-rsvps'))),
+            ('calendar-events-api', False, lambda: self._get(reverse('calendar-events-api'))),
+            ('event-rsvp', True, lambda: self._post(reverse('event-rsvp', args=[upcoming.pk]), {'status': 'going'})),
+            ('cron-send-event-reminders', True, send_event_reminders),
+            ('cron-send-rating-requests', True, send_rating_requests),
+            ('cron-complete-due-events', True, complete_due_events),
+            ('process-jobs', True, jobs.run),
+        ]
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=['*'], EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+        ), redirect_stdout(StringIO()):
+            for name, writes, run in scenarios:
+                if not only or name in only:
+                    results[name] = self._measure(run, writes)
+
+        report = {'meta': self._meta(user), 'results': results}
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<28} p50={result['p50_ms']:8.2f}ms  p95={result['p95_ms']:8.2f}ms  "
+                f"p99={result['p99_ms']:8.2f}ms  queries={result['queries']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if options['compare']:
+            self._compare(results, options['compare'], options['threshold'])
+
+    def _user(self, username):
+        if username:
+            return User.objects.get(username=username)
+        busiest = RSVP.objects.values('user').annotate(n=Count('pk')).order_by('-n').first()
+        if busiest is None:
+            raise CommandError('No RSVPs; run generate_data first')
+        return User.objects.get(pk=busiest['user'])
+
+    def _get(self, url, data=None):
+        response = self.client.get(url, data)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+
+    def _post(self, url, data):
+        response = self.client.post(url, data)
+        if response.status_code >= 400:
+            raise CommandError(f'POST {url} returned {response.status_code}')
+
+    def _measure(self, run, writes):
+        samples, queries = [], []
+        for i in range(self.options['warmup'] + self.options['repeat']):
+            if self.options['cold']:
+                cache.clear()
+            with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+                started = time_mod.perf_counter()
+                run()
+                elapsed = time_mod.perf_counter() - started
+                if writes:
+                    # Every sample sees the same data
+                    transaction.set_rollback(True)
+            if i >= self.options['warmup']:
+                samples.append(elapsed * 1000)
+                queries.append(len(captured))
+        samples.sort()
+        return {
+            'p50_ms': round(percentile(samples, 0.5), 3),
+            'p95_ms': round(percentile(samples, 0.95), 3),
+            'p99_ms': round(percentile(samples, 0.99), 3),
+            'mean_ms': round(sum(samples) / len(samples), 3),
+            'queries': max(queries),
+            'samples': len(samples),
+        }
+
+    def _meta(self, user):
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user': user.username,
+            'cold_cache': self.options['cold'],
+            'dataset': {
+                'users': User.objects.count(),
+                'events': Event.objects.count(),
+                'rsvps': RSVP.objects.count(),
+                'ratings': Rating.objects.count(),
+                'reminder_logs': ReminderLog.objects.count(),
+            },
+        }
+
+    def _compare(self, results, path, threshold):
+        with open(path) as f:
+            baseline = json.load(f)['results']
+        regressions = 0
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0
+            line = (
+                f"{name:<28} p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms ({change:+.0%}), "
+                f"queries {before['queries']} -> {result['queries']}"
+            )
+            if change > threshold or result['queries'] > before['queries']:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f'{regressions} regression(s) against {path}')
@@ -0,0 +1,87 @@
+import random
+import statistics
+import time as time_mod
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from events import search
+from events.models import Event
+
+WORDS = (
+    'robotics workshop django python meetup networking hackathon design music festival '
+    'startup pitch community garden charity concert cloud security data science webinar '
+    'leadership photography yoga marathon cooking chess gaming career fair library'
+).split()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text search latency with the old icontains scan (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated event counts')
+        parser.add_argument('--queries', default='robotics,python meetup,garden charity', help='Comma-separated search strings')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        queries = options['queries'].split(',')
+        self.stdout.write(f'search backend: {search.backend()}')
+        try:
+            with transaction.atomic():
+                creator = User.objects.create(username='bench-search-creator')
+                seeded = 0
+                for size in sizes:
+                    self._seed(creator, size - seeded)
+                    seeded = size
+                    for query in queries:
+                        fts = self._time(search.search_events(Event.objects.all(), query), options['repeat'])
+                        scan = self._time(self._icontains(query), options['repeat'])
+                        self.stdout.write(
+                            f'{size:>9} events  {query!r:<18} fts={fts * 1000:8.2f}ms  icontains={scan * 1000:8.2f}ms'
+                        )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _icontains(self, query):
+        return Event.objects.filter(
+            Q(title__icontains=query) | Q(description__icontains=query) | Q(location__icontains=query)
+        )
+
+    def _time(self, queryset, repeat):
+        # What a list view pays per search: the paginator COUNT plus the first page
+        samples = []
+        for _ in range(repeat):
+            started = time_mod.perf_counter()
+            queryset.count()
+            list(queryset[:6])
+            samples.append(time_mod.perf_counter() - started)
+        return statistics.median(samples)
+
+    def _seed(self, creator, count):
+        rng = random.Random(count)
+        today = timezone.now().date()
+        batch = []
+        for i in range(count):
+            batch.append(Event(
+                title=f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} w{rng.randint(0, 50000)}',
+                # Mostly long-tail filler words, like real descriptions
+                description=' '.join(f'w{rng.randint(0, 50000)}' for _ in range(40)),
+                location=f'{rng.choice(WORDS).title()} hall {rng.randint(1, 99)}',
+                date=today + timedelta(days=rng.randint(-365, 365)),
+                time=time(rng.randint(8, 21), 0),
+                creator=creator,
+            ))
+            if len(batch) == 5000:
+                Event.objects.bulk_create(batch)
+                batch = []
+        Event.objects.bulk_create(batch)
@@ -0,0 +1,154 @@
+import random
+import time as time_mod
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from events import jobs
+from events.models import Event, EventJob, RSVP, Rating, ReminderLog
+
+
+LOCATIONS = ['Main hall', 'Community Center', 'City Library', 'Riverside Park', 'Tech Hub', 'Town Square']
+TOPICS = ['Python', 'Jazz', 'Yoga', 'Startup', 'Photography', 'Cooking', 'Chess', 'Hiking', 'Design', 'Data']
+KINDS = ['meetup', 'workshop', 'concert', 'night', 'conference', 'class']
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic dataset (users, events, RSVPs, ratings, reminder logs) with bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--rsvps', type=int, default=20000, help='Target number of RSVPs')
+        parser.add_argument('--ratings', type=int, default=5000, help='Target number of ratings (past events only)')
+        parser.add_argument('--reminder-logs', type=int, default=5000, help='Target number of reminder log rows')
+        parser.add_argument('--past-fraction', type=float, default=0.3, help='Share of events dated in the past')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed yields the same dataset')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time_mod.perf_counter()
+
+        with transaction.atomic():
+            user_ids = self._phase('users', lambda: self._users(options['users']))
+            events = self._phase('events', lambda: self._events(rng, user_ids, options['events'], options['past_fraction']))
+            totals = self._phase('rsvps/ratings/reminder logs', lambda: self._attendance(rng, user_ids, events, options))
+            self._phase('counters', lambda: call_command('rebuild_event_counters', stdout=self.stdout))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(user_ids)} users, {len(events)} events, {totals['rsvps']} RSVPs, "
+            f"{totals['ratings']} ratings, {totals['reminder_logs']} reminder logs "
+            f"in {time_mod.perf_counter() - started:.1f}s"
+        ))
+
+    def _phase(self, name, run):
+        started = time_mod.perf_counter()
+        result = run()
+        self.stdout.write(f'{name}: {time_mod.perf_counter() - started:.2f}s')
+        return result
+
+    def _users(self, count):
+        # Usernames continue after existing rows so the command can be run repeatedly
+        offset = User.objects.count()
+        password = make_password('password')
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'synth{offset + i}', email=f'synth{offset + i}@example.com',
+                    first_name=f'User{offset + i}', password=password,
+                )
+                for i in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+        # bulk_create sends no post_save, so create the profiles the accounts signal would have
+        default_avatar = Profile(user=users[0]).thumb_url() if users else ''
+        Profile.objects.bulk_create(
+            [Profile(user=user, avatar_thumb_url=default_avatar) for user in users], batch_size=self.batch_size
+        )
+        return [user.pk for user in users]
+
+    def _events(self, rng, user_ids, count, past_fraction):
+        today = timezone.now().date()
+        events = []
+        for i in range(count):
+            past = rng.random() < past_fraction
+            days = -rng.randint(1, 365) if past else rng.randint(0, 180)
+            auto_complete = rng.random() < 0.5
+            event = Event(
+                title=f'{rng.choice(TOPICS)} {rng.choice(KINDS)} #{i}',
+                description=f'Synthetic {rng.choice(TOPICS).lower()} event for load testing.',
+                location=rng.choice(LOCATIONS),
+                date=today + timedelta(days=days),
+                time=time(rng.randint(8, 21), rng.choice((0, 30))),
+                duration_hours=rng.randint(1, 4),
+                auto_complete_days=1 if auto_complete else 0,
+                creator_id=rng.choice(user_ids),
+                # Most past events have been closed by their organizer or the auto-complete sweep
+                is_completed=past and rng.random() < 0.8,
+            )
+            # bulk_create skips save(), which derives these and schedules the event's jobs
+            event._compute_schedule()
+            events.append(event)
+        events = Event.objects.bulk_create(events, batch_size=self.batch_size)
+        now = timezone.now()
+        EventJob.objects.bulk_create(
+            [
+                EventJob(event_id=event.pk, kind=kind, due_at=due_at)
+                for event in events for kind, due_at in jobs.due_times(event, now).items()
+            ],
+            batch_size=self.batch_size,
+        )
+        return events
+
+    def _attendance(self, rng, user_ids, events, options):
+        """Stream RSVPs (skewed towards popular events) and the ratings and reminders they imply."""
+        today = timezone.now().date()
+        weights = [rng.paretovariate(1.5) for _ in events]
+        scale = options['rsvps'] / sum(weights)
+        past_going = sum(min(len(user_ids), round(w * scale)) for w, e in zip(weights, events) if e.date < today) * 0.8
+        rating_rate = min(1.0, options['ratings'] / past_going) if past_going else 0
+        reminder_rate = min(1.0, options['reminder_logs'] / (options['rsvps'] * 0.8 or 1))
+
+        totals = {'rsvps': 0, 'ratings': 0, 'reminder_logs': 0}
+        batches = {RSVP: [], Rating: [], ReminderLog: []}
+
+        def add(model, obj):
+            batches[model].append(obj)
+            if len(batches[model]) >= self.batch_size:
+                flush(model)
+
+        def flush(model):
+            model.objects.bulk_create(batches[model])
+            batches[model] = []
+
+        for weight, event in zip(weights, events):
+            attendees = rng.sample(user_ids, min(len(user_ids), round(weight * scale)))
+            past = event.date < today
+            for user_id in attendees:
+                if totals['rsvps'] >= options['rsvps']:
+                    break
+                status = 'going' if rng.random() < 0.8 else 'not_going'
+                add(RSVP, RSVP(event_id=event.pk, user_id=user_id, status=status))
+                totals['rsvps'] += 1
+                if status != 'going':
+                    continue
+                if past and totals['ratings'] < options['ratings'] and rng.random() < rating_rate:
+                    add(Rating, Rating(event_id=event.pk, user_id=user_id, stars=rng.choices(range(1, 6), (1, 2, 4, 8, 6))[0]))
+                    totals['ratings'] += 1
+                if totals['reminder_logs'] < options['reminder_logs'] and rng.random() < reminder_rate:
+                    reminder_type = 'post_event' if past else 'pre_event'
+                    add(ReminderLog, ReminderLog(event_id=event.pk, user_id=user_id, reminder_type=reminder_type))
+                    totals['reminder_logs'] += 1
+
+        for model in batches:
+            flush(model)
+        return totals
@@ -0,0 +1,64 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from events import images
+
+
+class Command(BaseCommand):
+    help = 'Drain the image job queue, writing WebP/JPEG renditions for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when the queue is empty instead of polling for new jobs'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of jobs claimed per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2.0,
+            help='Seconds to wait between polls when the queue is empty (default: 2)'
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='First queue every image that has no renditions yet'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            queued = self._backfill()
+            self.stdout.write(f'Queued {queued} image(s) without renditions')
+
+        totals = {}
+        while True:
+            stats = images.run(options['batch_size'])
+            for outcome, count in stats.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            if any(stats.values()):
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {totals['processed']} image(s), {totals['unchanged']} unchanged, "
+            f"{totals['skipped']} skipped, {totals['failed']} failed"
+        ))
+
+    def _backfill(self):
+        queued = 0
+        for model in apps.get_models():
+            for field_name in getattr(model, 'RENDITIONS', {}):
+                hash_field, _ = images.state_fields(field_name)
+                default = model._meta.get_field(field_name).default
+                missing = (
+                    model._default_manager.filter(**{hash_field: ''})
+                    .exclude(**{field_name: ''}).exclude(**{field_name: default})
+                )
+                for instance in missing.only('pk', field_name).iterator():
+                    images.enqueue(instance, field_name)
+                    queued += 1
+        return queued
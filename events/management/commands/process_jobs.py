@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from events import jobs
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Run due event jobs (reminders, rating requests, auto-completion); several workers may run at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no job is due instead of polling for new ones'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of jobs claimed per batch (default: 100)'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=10.0,
+            help='Seconds to wait between polls when no job is due (default: 10)'
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='First (re)schedule the jobs of every event that still needs one'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            scheduled = self._backfill()
+            self.stdout.write(f'Scheduled jobs for {scheduled} event(s)')
+
+        totals = {'done': 0, 'retried': 0, 'failed': 0}
+        while True:
+            stats = jobs.run(options['batch_size'])
+            for outcome, count in stats.items():
+                totals[outcome] += count
+            if any(stats.values()):
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {totals['done']} job(s), {totals['retried']} to retry, {totals['failed']} failed"
+        ))
+
+    def _backfill(self):
+        now = timezone.now()
+        events = Event.objects.filter(
+            Q(date__gte=(now - jobs.RATING_WINDOW).date()) | Q(is_completed=False, auto_complete_datetime__isnull=False)
+        )
+        count = 0
+        for event in events.iterator():
+            jobs.schedule(event, now=now)
+            count += 1
+        return count
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from events.models import Event, RSVP, Rating
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized going/rating counters and rating histograms on every event from scratch'
+
+    def handle(self, *args, **options):
+        going = (
+            RSVP.objects.filter(event=OuterRef('pk'), status='going')
+            .order_by().values('event').annotate(total=Count('pk')).values('total')
+        )
+        ratings = Rating.objects.filter(event=OuterRef('pk')).order_by().values('event')
+        rating_count = ratings.annotate(total=Count('pk')).values('total')
+        rating_sum = ratings.annotate(total=Sum('stars')).values('total')
+        histogram = {
+            f'rating_stars_{stars}': ratings.annotate(total=Count('pk', filter=Q(stars=stars))).values('total')
+            for stars in range(1, 6)
+        }
+
+        zero = Value(0, output_field=IntegerField())
+        with transaction.atomic():
+            updated = Event.objects.update(
+                going_count=Coalesce(Subquery(going, output_field=IntegerField()), zero),
+                rating_count=Coalesce(Subquery(rating_count, output_field=IntegerField()), zero),
+                rating_sum=Coalesce(Subquery(rating_sum, output_field=IntegerField()), zero),
+                **{
+                    field: Coalesce(Subquery(subquery, output_field=IntegerField()), zero)
+                    for field, subquery in histogram.items()
+                },
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt counters for {updated} event(s)')
+        )
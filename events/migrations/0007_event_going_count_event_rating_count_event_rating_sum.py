@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    RSVP = apps.get_model('events', 'RSVP')
+    Rating = apps.get_model('events', 'Rating')
+
+    going = (
+        RSVP.objects.filter(event=OuterRef('pk'), status='going')
+        .order_by().values('event').annotate(total=Count('pk')).values('total')
+    )
+    ratings = Rating.objects.filter(event=OuterRef('pk')).order_by().values('event')
+    zero = Value(0, output_field=IntegerField())
+    Event.objects.update(
+        going_count=Coalesce(Subquery(going, output_field=IntegerField()), zero),
+        rating_count=Coalesce(Subquery(ratings.annotate(total=Count('pk')).values('total'), output_field=IntegerField()), zero),
+        rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('stars')).values('total'), output_field=IntegerField()), zero),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_remove_event_duration_minutes_event_duration_days_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='going_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_going_count_event_rating_count_event_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rsvp',
+            name='waitlisted_at',
+            field=models.DateTimeField(blank=True, help_text='Position on the waitlist while the event is full', null=True),
+        ),
+        migrations.AlterField(
+            model_name='rsvp',
+            name='status',
+            field=models.CharField(choices=[('going', 'Going'), ('not_going', 'Not Going'), ('waitlisted', 'Waitlisted')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_reminders(apps, schema_editor):
+    ReminderLog = apps.get_model('events', 'ReminderLog')
+
+    # Keep the earliest log per (event, user, reminder_type) before adding the unique constraint
+    keep = (
+        ReminderLog.objects.values('event', 'user', 'reminder_type')
+        .annotate(first_id=Min('id'))
+        .values('first_id')
+    )
+    ReminderLog.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_rsvp_waitlisted_at_alter_rsvp_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'time'], name='event_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['-date', '-time'], name='event_completed_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['end_datetime'], name='event_end_datetime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['auto_complete_datetime'], name='event_auto_complete_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rsvp',
+            index=models.Index(fields=['event', 'status'], name='rsvp_event_status_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_reminders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reminderlog',
+            constraint=models.UniqueConstraint(fields=('event', 'user', 'reminder_type'), name='reminderlog_unique_per_type'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+# A frozen copy of the search index SQL: events.search may change, this migration must not.
+# Later migrations that rebuild events_event on SQLite (which drops triggers) reuse install_search_index.
+
+FTS_TABLE = 'events_event_fts'
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, location, content='events_event', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_event_fts_ai AFTER INSERT ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_event_fts_ad AFTER DELETE ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_event_fts_au AFTER UPDATE OF title, description, location ON events_event BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS events_event_fts_ai',
+    'DROP TRIGGER IF EXISTS events_event_fts_ad',
+    'DROP TRIGGER IF EXISTS events_event_fts_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_INSTALL = [
+    """ALTER TABLE events_event ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS event_search_vector_gin ON events_event USING gin (search_vector)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS event_search_vector_gin',
+    'ALTER TABLE events_event DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _sqlite_has_fts5(cursor):
+    try:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+    except Exception:
+        return False
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            statements = POSTGRES_INSTALL
+        elif vendor == 'sqlite' and _sqlite_has_fts5(cursor):
+            statements = SQLITE_INSTALL
+        else:
+            return
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def uninstall_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_event_indexes_reminderlog_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
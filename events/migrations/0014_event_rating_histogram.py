@@ -0,0 +1,56 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_histogram(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Rating = apps.get_model('events', 'Rating')
+    buckets = {}
+    for row in Rating.objects.values('event_id', 'stars').annotate(total=Count('pk')).order_by():
+        buckets.setdefault(row['event_id'], {})[f"rating_stars_{row['stars']}"] = row['total']
+    for event_id, counts in buckets.items():
+        Event.objects.filter(pk=event_id).update(**counts)
+
+
+def reinstall_search_index(apps, schema_editor):
+    # Adding NOT NULL columns rebuilds events_event on SQLite, dropping the FTS triggers
+    import_module('events.migrations.0010_event_full_text_search').install_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_eventjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='rating_stars_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_stars_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_stars_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_stars_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_stars_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+        migrations.RunPython(backfill_histogram, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+import EventPlanner.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_rating_histogram'),
+    ]
+
+    operations = [
+        # Storage is not a column attribute; record it without rebuilding events_event on SQLite
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='event',
+                    name='image',
+                    field=models.ImageField(default='event_pics/event_default.png', storage=EventPlanner.storage.media_storage, upload_to='event_pics'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,100 @@
+from zoneinfo import ZoneInfo
+
+from django.db import migrations
+from django.utils import timezone
+
+# A frozen copy of the trigger SQL: events.schedule may change, this migration must not.
+# Later migrations that rebuild events_event on SQLite (which drops triggers) reuse install_schedule_triggers.
+
+TRIGGER_COLUMNS = (
+    'date, time, duration_days, duration_hours, auto_complete_days, auto_complete_hours, '
+    'end_datetime, auto_complete_datetime'
+)
+
+SQLITE_END = "datetime(new.date || ' ' || new.time, '+' || new.duration_days || ' days', '+' || new.duration_hours || ' hours')"
+SQLITE_AUTO_COMPLETE = (
+    "CASE WHEN new.auto_complete_days + new.auto_complete_hours > 0 THEN "
+    "datetime(new.date || ' ' || new.time, '+' || new.auto_complete_days || ' days', "
+    "'+' || new.auto_complete_hours || ' hours') END"
+)
+SQLITE_STALE = f'new.end_datetime IS NOT {SQLITE_END} OR new.auto_complete_datetime IS NOT {SQLITE_AUTO_COMPLETE}'
+SQLITE_REFRESH = f"""UPDATE events_event SET end_datetime = {SQLITE_END}, auto_complete_datetime = {SQLITE_AUTO_COMPLETE}
+        WHERE id = new.id;"""
+
+# The WHEN guard skips rows save() already computed, and stops the trigger's own UPDATE re-firing it
+SQLITE_INSTALL = [
+    f"""CREATE TRIGGER IF NOT EXISTS events_event_schedule_ai AFTER INSERT ON events_event
+        WHEN {SQLITE_STALE} BEGIN
+        {SQLITE_REFRESH}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_event_schedule_au AFTER UPDATE OF {TRIGGER_COLUMNS} ON events_event
+        WHEN {SQLITE_STALE} BEGIN
+        {SQLITE_REFRESH}
+    END""",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS events_event_schedule_ai',
+    'DROP TRIGGER IF EXISTS events_event_schedule_au',
+]
+
+POSTGRES_FUNCTION = """CREATE OR REPLACE FUNCTION events_event_schedule() RETURNS trigger AS $$
+        BEGIN
+            NEW.end_datetime := ((NEW.date + NEW.time) AT TIME ZONE {tz})
+                + make_interval(days => NEW.duration_days, hours => NEW.duration_hours);
+            NEW.auto_complete_datetime := CASE WHEN NEW.auto_complete_days + NEW.auto_complete_hours > 0 THEN
+                ((NEW.date + NEW.time) AT TIME ZONE {tz})
+                + make_interval(days => NEW.auto_complete_days, hours => NEW.auto_complete_hours) END;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql"""
+
+POSTGRES_INSTALL = [
+    'DROP TRIGGER IF EXISTS events_event_schedule ON events_event',
+    f"""CREATE TRIGGER events_event_schedule BEFORE INSERT OR UPDATE OF {TRIGGER_COLUMNS} ON events_event
+        FOR EACH ROW EXECUTE FUNCTION events_event_schedule()""",
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS events_event_schedule ON events_event',
+    'DROP FUNCTION IF EXISTS events_event_schedule()',
+]
+
+
+def _tz_literal():
+    name = timezone.get_default_timezone_name()
+    ZoneInfo(name)  # refuse anything that is not a real zone before inlining it
+    return "'{}'".format(name.replace("'", "''"))
+
+
+def install_schedule_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = [POSTGRES_FUNCTION.format(tz=_tz_literal()), *POSTGRES_INSTALL]
+    elif vendor == 'sqlite' and timezone.get_default_timezone_name() in ('UTC', 'Etc/UTC'):
+        # SQLite has no time zone database, so it only computes the schedule for UTC
+        statements = SQLITE_INSTALL
+    else:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def uninstall_schedule_triggers(apps, schema_editor):
+    statements = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_alter_event_image'),
+    ]
+
+    # Existing rows are left to `manage.py backfill_event_schedule`, which works in short chunks
+    operations = [
+        migrations.RunPython(install_schedule_triggers, uninstall_schedule_triggers),
+    ]
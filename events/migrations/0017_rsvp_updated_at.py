@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_event_schedule_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rsvp',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,38 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.conf import settings
-from django.core.files.storage import FileSystemStorage
 from django.urls import reverse
 from django.utils import timezone
-from PIL import Image
-import os
+from EventPlanner.storage import media_storage
+from . import caching, images, jobs
 from datetime import datetime, timedelta
 
 
-def _resolve_media_storage():
-    media_root = os.environ.get('MEDIA_ROOT') or getattr(settings, 'MEDIA_ROOT', None)
-    if media_root:
-        try:
-            os.makedirs(media_root, exist_ok=True)
-            test_path = os.path.join(media_root, '.write-test')
-            with open(test_path, 'wb') as f:
-                f.write(b'1')
-            os.remove(test_path)
-        except Exception:
-            media_root = '/tmp/media'
-    else:
-        media_root = '/tmp/media'
-    try:
-        os.makedirs(media_root, exist_ok=True)
-    except Exception:
-        pass
-    base_url = getattr(settings, 'MEDIA_URL', '/media/')
-    return FileSystemStorage(location=media_root, base_url=base_url)
-
-
-_event_media_storage = _resolve_media_storage()
-
-
 class Event(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -45,15 +19,50 @@ class Event(models.Model):
     auto_complete_hours = models.PositiveIntegerField(default=0, help_text="Hours after event start to auto-complete")
     capacity = models.PositiveIntegerField(blank=True, null=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_events')
-    image = models.ImageField(default='event_pics/event_default.png', upload_to='event_pics', storage=_event_media_storage)
+    image = models.ImageField(default='event_pics/event_default.png', upload_to='event_pics', storage=media_storage)
     end_datetime = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_completed = models.BooleanField(default=False, help_text="Mark this event as manually completed")
     auto_complete_datetime = models.DateTimeField(blank=True, null=True, help_text="Event will be automatically marked as completed at this date and time")
+    # Denormalized counters maintained by events.signals; rebuild with `manage.py rebuild_event_counters`
+    going_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    # Histogram: number of 1..5 star ratings
+    rating_stars_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_stars_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_stars_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_stars_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_stars_5 = models.PositiveIntegerField(default=0, editable=False)
+    # Written by the image worker (events.images); see RENDITIONS
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+    
+    # Written only through F() updates so concurrent RSVPs/ratings are never clobbered by save()
+    RATING_HISTOGRAM_FIELDS = tuple(f'rating_stars_{stars}' for stars in range(1, 6))
+    COUNTER_FIELDS = ('going_count', 'rating_count', 'rating_sum', *RATING_HISTOGRAM_FIELDS)
+    RENDITION_FIELDS = ('image_hash', 'image_renditions')
+    
+    RENDITIONS = {
+        'image': {
+            'card': (600, 400, True),
+            'detail': (1200, 800, False),
+        },
+    }
     
     class Meta:
         ordering = ['date', 'time']
+        indexes = [
+            # EventListView keyset ordering and the cron jobs' date lookups; CompletedEventsView walks
+            # it backwards from today for ended events
+            models.Index(fields=['date', 'time', 'id'], name='event_date_time_id_idx'),
+            # ...and walks this one for events marked completed, whatever their date
+            models.Index(fields=['-date', '-time', '-id'], condition=models.Q(is_completed=True), name='event_completed_keyset_idx'),
+            models.Index(fields=['end_datetime'], name='event_end_datetime_idx'),
+            # Auto-completion sweep only ever looks at events that are still open
+            models.Index(fields=['auto_complete_datetime'], condition=models.Q(is_completed=False), name='event_auto_complete_due_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -76,17 +85,100 @@ class Event(models.Model):
     
     @property
     def attendee_count(self):
-        return self.rsvps.filter(status='going').count()
+        return self.going_count
+    
+    @classmethod
+    def renditions_changed(cls, pk):
+        caching.touch([pk])
+    
+    @property
+    def card_image(self):
+        return images.rendition(self, 'image', 'card')
+    
+    @property
+    def detail_image(self):
+        return images.rendition(self, 'image', 'detail')
     
     @property
     def average_rating(self):
-        ratings = self.ratings.all()
-        if ratings:
-            return sum(rating.stars for rating in ratings) / len(ratings)
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
     
+    @property
+    def rating_histogram(self):
+        """``[{'stars', 'count', 'percent'}]`` from 5 stars down to 1, read from the counters."""
+        return [
+            {
+                'stars': stars,
+                'count': getattr(self, f'rating_stars_{stars}'),
+                'percent': round(100 * getattr(self, f'rating_stars_{stars}') / self.rating_count) if self.rating_count else 0,
+            }
+            for stars in range(5, 0, -1)
+        ]
+    
+    # Fields that feed end_datetime / auto_complete_datetime
+    SCHEDULE_FIELDS = {'date', 'time', 'duration_days', 'duration_hours', 'auto_complete_days', 'auto_complete_hours'}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored image so unchanged images are not reprocessed on save
+        instance._loaded_image = instance.__dict__.get('image')
+        # ...and the stored schedule so only reschedules replace the event's jobs
+        instance._loaded_schedule = instance._schedule_key()
+        return instance
+    
+    def _schedule_key(self):
+        # Not is_completed: marking or undoing completion keeps the jobs already queued,
+        # so an undo cannot queue an auto-complete job that is already past due
+        return tuple(self.__dict__.get(name) for name in ('date', 'time', 'end_datetime', 'auto_complete_datetime'))
+    
+    @property
+    def start_datetime(self):
+        if not self.date or not self.time:
+            return None
+        start = datetime.combine(self.date, self.time)
+        return timezone.make_aware(start, timezone.get_current_timezone()) if timezone.is_naive(start) else start
+    
     def save(self, *args, **kwargs):
-        # Compute end_datetime from date, time, and duration
+        update_fields = kwargs.get('update_fields')
+        # Status-only saves (e.g. update_fields=['is_completed', 'updated_at']) skip the derived work below
+        if update_fields is None or self.SCHEDULE_FIELDS.intersection(update_fields):
+            self._compute_schedule()
+        image_changed = (
+            (update_fields is None or 'image' in update_fields)
+            and self.image.name != getattr(self, '_loaded_image', None)
+        )
+
+        if image_changed:
+            images.reset(self, 'image')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields).union(self.RENDITION_FIELDS)
+
+        if not self._state.adding and not kwargs.get('force_insert') and update_fields is None:
+            # Renditions are only written here when the image was replaced, never clobbered otherwise
+            skipped = self.COUNTER_FIELDS if image_changed else self.COUNTER_FIELDS + self.RENDITION_FIELDS
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in skipped
+            ]
+
+        created = self._state.adding
+        rescheduled = self._schedule_key() != getattr(self, '_loaded_schedule', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if image_changed:
+                images.enqueue(self, 'image')
+            if rescheduled:
+                jobs.schedule(self, created=created)
+        if image_changed:
+            self._loaded_image = self.image.name
+        self._loaded_schedule = self._schedule_key()
+    
+    def _compute_schedule(self):
+        # The database triggers in events.schedule keep the stored columns right for writes
+        # that bypass save(); this fills in the same values on the instance without a refetch
         try:
             start_naive = datetime.combine(self.date, self.time)
             tz = timezone.get_current_timezone()
@@ -100,41 +192,53 @@ class Event(models.Model):
             if self.auto_complete_days or self.auto_complete_hours:
                 auto_complete_delta = timedelta(days=self.auto_complete_days or 0, hours=self.auto_complete_hours or 0)
                 self.auto_complete_datetime = start_dt + auto_complete_delta
+            else:
+                self.auto_complete_datetime = None
         except Exception:
             # If any field missing during creation form clean, skip computation
             pass
 
-        super().save(*args, **kwargs)
-
-        # Resize image only when stored on local filesystem (e.g., dev or non-cloud storage)
-        image_path = getattr(self.image, 'path', None)
-        if Image and self.image and image_path and os.path.isfile(image_path):
-            try:
-                img = Image.open(image_path)
-                if img.height > 800 or img.width > 800:
-                    output_size = (800, 800)
-                    img.thumbnail(output_size)
-                    img.save(image_path)
-            except Exception:
-                pass
-
 
 class RSVP(models.Model):
     STATUS_CHOICES = [
         ('going', 'Going'),
         ('not_going', 'Not Going'),
+        ('waitlisted', 'Waitlisted'),
     ]
     
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rsvps')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     created_at = models.DateTimeField(default=timezone.now)
+    waitlisted_at = models.DateTimeField(blank=True, null=True, help_text="Position on the waitlist while the event is full")
+    # Set explicitly by the update() calls in events.services, which skip auto_now
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['event', 'user']
+        indexes = [
+            # Going attendees per event (counters rebuild, reminder recipients, attendee lists)
+            models.Index(fields=['event', 'status'], name='rsvp_event_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.event.title} - {self.status}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so signals can apply counter deltas
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the row write and the Event counter update in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
 
 
 class Rating(models.Model):
@@ -149,6 +253,22 @@ class Rating(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.event.title} - {self.stars} stars"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored stars so signals can apply counter deltas
+        instance._loaded_stars = instance.__dict__.get('stars')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the row write and the Event counter update in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
 
 
 class ReminderLog(models.Model):
@@ -160,5 +280,88 @@ class ReminderLog(models.Model):
     ])
     sent_at = models.DateTimeField(default=timezone.now)
     
+    class Meta:
+        constraints = [
+            # One reminder of each type per attendee; lets the mailer insert with ON CONFLICT DO NOTHING
+            models.UniqueConstraint(fields=['event', 'user', 'reminder_type'], name='reminderlog_unique_per_type'),
+        ]
+    
     def __str__(self):
         return f"{self.reminder_type} - {self.event.title} - {self.user.username}"
+
+
+class ImageJob(models.Model):
+    """A pending rendition run for one image field; drained by ``manage.py process_image_jobs``."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+    
+    model_label = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='imagejob_status_idx'),
+        ]
+        constraints = [
+            # Re-saving an image that is still queued does not queue it twice
+            models.UniqueConstraint(
+                fields=['model_label', 'object_id', 'field_name'],
+                condition=models.Q(status='pending'),
+                name='imagejob_unique_pending',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.model_label}#{self.object_id}.{self.field_name} ({self.status})"
+
+
+class EventJob(models.Model):
+    """A reminder, rating request or auto-completion due at ``due_at``; run by ``manage.py process_jobs``."""
+    KIND_CHOICES = [
+        ('event_reminder', 'Event reminder'),
+        ('rating_request', 'Rating request'),
+        ('auto_complete', 'Auto-complete'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+    
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    due_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # Workers only ever scan pending jobs in due order
+            models.Index(fields=['due_at'], condition=models.Q(status='pending'), name='eventjob_due_idx'),
+            models.Index(fields=['locked_by'], condition=models.Q(status='running'), name='eventjob_running_idx'),
+        ]
+        constraints = [
+            # Rescheduling replaces the pending job of each kind instead of adding another
+            models.UniqueConstraint(
+                fields=['event', 'kind'],
+                condition=models.Q(status='pending'),
+                name='eventjob_unique_pending',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for event #{self.event_id} at {self.due_at} ({self.status})"
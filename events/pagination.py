@@ -0,0 +1,178 @@
+"""Keyset (seek) pagination over ``(date, time, id)``.
+
+Unlike offset pagination it never runs ``COUNT(*)`` and never skips rows
+with ``OFFSET``: each page is one index range scan starting right after the
+previous page's last key, so page 10,000 costs the same as page 1. Cursors
+are opaque URL-safe tokens.
+"""
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``keys`` (ascending, or descending when ``descending``).
+
+    ``keys`` must end with a unique column. Works with model instances and
+    ``values()`` dicts alike, as long as every key is selected.
+
+    When ``queryset`` filters on an ``OR`` that no single index can walk in key
+    order, pass its arms as ``branches`` (``Q`` objects that together cover
+    every row). Each branch is then walked separately for one page of primary
+    keys, and the page is merged from the union of those walks.
+    """
+
+    def __init__(self, queryset, per_page, keys=('date', 'time', 'id'), descending=False, branches=()):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+        self.descending = descending
+        self.branches = tuple(branches)
+        self._fields = [queryset.model._meta.get_field(key) for key in self.keys]
+
+    def _ordering(self, forward):
+        desc = self.descending if forward else not self.descending
+        return [f'-{key}' if desc else key for key in self.keys]
+
+    def _seek(self, values, forward):
+        """Rows strictly after ``values`` in the (possibly reversed) ordering."""
+        op = 'gt' if forward != self.descending else 'lt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            prefix = dict(zip(self.keys[:i], values[:i]))
+            condition |= Q(**prefix, **{f'{key}__{op}': values[i]})
+        # Redundant leading-column bound so the planner uses a range scan
+        return Q(**{f'{self.keys[0]}__{op}e': values[0]}) & condition
+
+    def _page_queryset(self, values, forward):
+        """One row more than a page, after ``values`` (``None`` for the first page)."""
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        ordering = self._ordering(forward)
+        limit = self.per_page + 1
+        if self.branches:
+            walks = [queryset.filter(branch).order_by(*ordering).values('pk')[:limit] for branch in self.branches]
+            queryset = queryset.filter(reduce(or_, (Q(pk__in=walk) for walk in walks)))
+        return queryset.order_by(*ordering)[:limit]
+
+    def _key_of(self, row):
+        if isinstance(row, dict):
+            return [row[key] for key in self.keys]
+        return [getattr(row, key) for key in self.keys]
+
+    def encode_cursor(self, row, forward=True):
+        values = [_to_json(v) for v in self._key_of(row)]
+        payload = json.dumps({'k': values, 'f': forward}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [field.to_python(v) for field, v in zip(self._fields, payload['k'])]
+            if len(values) != len(self.keys):
+                raise ValueError
+            return values, bool(payload['f'])
+        except Exception as e:
+            raise InvalidCursor(cursor) from e
+
+    def page(self, cursor=None):
+        """Return the page after (or, for a previous-cursor, before) ``cursor``.
+
+        An invalid cursor yields the first page.
+        """
+        values, forward = None, True
+        if cursor:
+            try:
+                values, forward = self.decode_cursor(cursor)
+            except InvalidCursor:
+                values, forward = None, True
+
+        rows = list(self._page_queryset(values, forward))
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if forward:
+            has_next, has_previous = more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, more
+
+        return KeysetPage(
+            rows,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor(rows[-1], True) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0], False) if has_previous and rows else None,
+        )
+
+
+def _to_json(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class KeysetPaginationMixin:
+    """ListView mixin selecting offset or keyset pagination per view.
+
+    Set ``pagination_mode = 'keyset'`` (and ``keyset_descending`` for
+    newest-first lists); pages are then addressed by ``?cursor=``. Views whose
+    queryset filters on an ``OR`` return its arms from
+    :meth:`get_keyset_branches` (see :class:`KeysetPaginator`).
+    """
+    pagination_mode = 'offset'
+    keyset_descending = False
+
+    def get_keyset_branches(self):
+        return ()
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(
+            queryset, page_size, descending=self.keyset_descending, branches=self.get_keyset_branches()
+        )
+        page = paginator.page(self.request.GET.get('cursor'))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pagination_mode'] = self.pagination_mode
+        return context
+
@@ -0,0 +1,113 @@
+"""Database-maintained ``end_datetime`` and ``auto_complete_datetime``.
+
+Both columns are derived from ``date``, ``time``, ``duration_*`` and
+``auto_complete_*``. Triggers on ``events_event`` recompute them on every
+insert and on every update of those columns, so ``queryset.update()``,
+``bulk_create`` and raw imports can no longer leave them stale:
+
+- PostgreSQL: a ``BEFORE INSERT OR UPDATE`` trigger sets ``NEW`` values,
+  interpreting date and time in ``settings.TIME_ZONE``.
+- SQLite: ``AFTER INSERT`` / ``AFTER UPDATE`` triggers rewrite the row when
+  the stored values differ. SQLite has no time zone database, so these are
+  only installed when ``TIME_ZONE`` is UTC.
+- Anything else keeps relying on ``Event.save()``.
+
+They stay ordinary indexed columns rather than ``GeneratedField``\\ s: turning
+an existing column into a generated one means dropping and re-adding it,
+which rewrites the whole table under an exclusive lock. Rows written before
+the triggers existed are fixed in short chunks by
+``manage.py backfill_event_schedule`` (see :func:`backfill`).
+
+Migration 0016 creates the triggers from its own copy of these expressions;
+like the search triggers they are dropped whenever SQLite rebuilds
+``events_event``, so later migrations that do must re-run its installer.
+"""
+from zoneinfo import ZoneInfo
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+SOURCE_COLUMNS = ('date', 'time', 'duration_days', 'duration_hours', 'auto_complete_days', 'auto_complete_hours')
+DERIVED_COLUMNS = ('end_datetime', 'auto_complete_datetime')
+BACKFILL_CHUNK_SIZE = 1000
+
+_SQLITE_END = "datetime({row}date || ' ' || {row}time, '+' || {row}duration_days || ' days', '+' || {row}duration_hours || ' hours')"
+_SQLITE_AUTO_COMPLETE = (
+    "CASE WHEN {row}auto_complete_days + {row}auto_complete_hours > 0 THEN "
+    "datetime({row}date || ' ' || {row}time, '+' || {row}auto_complete_days || ' days', "
+    "'+' || {row}auto_complete_hours || ' hours') END"
+)
+_POSTGRES_END = "(({row}date + {row}time) AT TIME ZONE {tz}) + make_interval(days => {row}duration_days, hours => {row}duration_hours)"
+_POSTGRES_AUTO_COMPLETE = (
+    "CASE WHEN {row}auto_complete_days + {row}auto_complete_hours > 0 THEN "
+    "(({row}date + {row}time) AT TIME ZONE {tz}) "
+    "+ make_interval(days => {row}auto_complete_days, hours => {row}auto_complete_hours) END"
+)
+
+
+def _tz_literal():
+    name = timezone.get_default_timezone_name()
+    ZoneInfo(name)  # refuse anything that is not a real zone before inlining it
+    return "'{}'".format(name.replace("'", "''"))
+
+
+def _expressions(vendor, row=''):
+    """``(end, auto_complete)`` SQL for ``vendor``, reading columns from ``row`` (e.g. ``'new.'``)."""
+    if vendor == 'postgresql':
+        tz = _tz_literal()
+        return _POSTGRES_END.format(row=row, tz=tz), _POSTGRES_AUTO_COMPLETE.format(row=row, tz=tz)
+    return _SQLITE_END.format(row=row), _SQLITE_AUTO_COMPLETE.format(row=row)
+
+
+def supported(vendor):
+    """Whether the database computes the schedule itself on ``vendor``."""
+    if vendor == 'postgresql':
+        return True
+    return vendor == 'sqlite' and timezone.get_default_timezone_name() in ('UTC', 'Etc/UTC')
+
+
+def _backfill_sql(last, upper):
+    vendor = connection.vendor
+    end, auto_complete = _expressions(vendor)
+    differs = 'IS DISTINCT FROM' if vendor == 'postgresql' else 'IS NOT'
+    return (
+        f'UPDATE events_event SET end_datetime = {end}, auto_complete_datetime = {auto_complete} '
+        f'WHERE id > %s AND id <= %s '
+        f'AND (end_datetime {differs} {end} OR auto_complete_datetime {differs} {auto_complete})'
+    ), [last, upper]
+
+
+def _backfill_in_python(Event, last, upper):
+    stale = []
+    for event in Event.objects.filter(pk__gt=last, pk__lte=upper).only('pk', *SOURCE_COLUMNS, *DERIVED_COLUMNS):
+        before = (event.end_datetime, event.auto_complete_datetime)
+        event._compute_schedule()
+        if (event.end_datetime, event.auto_complete_datetime) != before:
+            stale.append(event)
+    Event.objects.bulk_update(stale, DERIVED_COLUMNS)
+    return len(stale)
+
+
+def backfill(chunk_size=BACKFILL_CHUNK_SIZE):
+    """Recompute stale schedules in primary-key ranges of ``chunk_size``, one short transaction each.
+
+    Yields ``(last_id, updated)`` after every chunk so callers can report
+    progress or pause between chunks. Rows that are already correct are not
+    rewritten.
+    """
+    Event = apps.get_model('events', 'Event')
+    top = Event.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    last = 0
+    while last < top:
+        upper = last + chunk_size
+        with transaction.atomic():
+            if supported(connection.vendor):
+                with connection.cursor() as cursor:
+                    cursor.execute(*_backfill_sql(last, upper))
+                    updated = cursor.rowcount
+            else:
+                updated = _backfill_in_python(Event, last, upper)
+        last = upper
+        yield min(last, top), updated
@@ -0,0 +1,84 @@
+"""Full-text event search shared by the event list views.
+
+- PostgreSQL: a stored generated ``tsvector`` column (``search_vector``,
+  weighted title > location > description) with a GIN index, ranked by
+  ``ts_rank``.
+- SQLite: an external-content FTS5 table (``events_event_fts``) kept in sync
+  by triggers on ``events_event``, ranked by ``bm25``.
+- Anything else (or SQLite built without FTS5) falls back to ``icontains``.
+
+Both index flavours are created by migration 0010, and re-created by later
+migrations that rebuild ``events_event`` on SQLite (dropping its triggers).
+Terms are matched as prefixes so keystroke-driven searches behave like the
+old substring search for the start of words.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'events_event_fts'
+
+_backend_cache = {}
+
+
+def backend():
+    """Return 'postgresql', 'sqlite' or 'fallback' for the default connection."""
+    key = (connection.vendor, connection.settings_dict['NAME'])
+    if key not in _backend_cache:
+        name = 'fallback'
+        if connection.vendor == 'postgresql':
+            name = 'postgresql'
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            name = 'sqlite'
+        _backend_cache[key] = name
+    return _backend_cache[key]
+
+
+def _terms(query):
+    return re.findall(r'\w+', query or '')
+
+
+def search_events(queryset, query, rank=False):
+    """Filter an Event queryset to rows matching ``query``.
+
+    With ``rank=True`` a ``search_rank`` annotation (higher is better) is added
+    so callers can ``order_by('-search_rank')``.
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset
+
+    engine = backend()
+    if engine == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        queryset = queryset.filter(RawSQL(
+            "events_event.search_vector @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField()
+        ))
+        if rank:
+            queryset = queryset.annotate(search_rank=RawSQL(
+                "ts_rank(events_event.search_vector, to_tsquery('english', %s))", [tsquery],
+                output_field=FloatField(),
+            ))
+        return queryset
+
+    if engine == 'sqlite':
+        match = ' '.join('"{}"*'.format(term.replace('"', '')) for term in terms)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+        if rank:
+            # bm25() is lower-is-better, negate it so both backends sort descending
+            queryset = queryset.annotate(search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = events_event.id',
+                [match], output_field=FloatField(),
+            ))
+        return queryset
+
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(description__icontains=term) | Q(location__icontains=term)
+        )
+    return queryset
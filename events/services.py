@@ -0,0 +1,121 @@
+"""RSVP admission engine.
+
+Seats are claimed with a single conditional UPDATE on ``Event.going_count``
+(``going_count < capacity``), so concurrent requests can never oversubscribe an
+event and no read-then-write race exists. Requests that do not get a seat are
+put on an ordered waitlist that is promoted whenever a seat is released.
+
+RSVP rows written here bypass ``Model.save()`` on purpose: the counter change is
+applied by the seat claim/release itself, not by the signal handlers in
+``events.signals``.
+
+SQLite cannot upgrade a read transaction to a write while another connection
+is writing and reports "database is locked" at once instead of waiting, so
+:func:`set_rsvp_status` retries the whole transaction with a short jittered
+backoff. Other queries keep SQLite's default deferred transactions.
+"""
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import caching
+from .models import Event, RSVP
+
+
+LOCK_RETRIES = 12
+LOCK_BACKOFF = 0.005  # seconds, doubled on every retry
+
+
+def _claim_seat(event_id):
+    """Atomically take one seat. Returns True when a seat was available."""
+    has_room = Q(capacity__isnull=True) | Q(going_count__lt=F('capacity'))
+    return Event.objects.filter(has_room, pk=event_id).update(going_count=F('going_count') + 1) == 1
+
+
+def _release_seat(event_id):
+    Event.objects.filter(pk=event_id, going_count__gt=0).update(going_count=F('going_count') - 1)
+
+
+def promote_waitlist(event_id):
+    """Move waitlisted RSVPs to going, oldest first, while seats are available.
+
+    Returns the number of promoted RSVPs. Must be called inside a transaction.
+    """
+    promoted = 0
+    while True:
+        candidate = (
+            RSVP.objects.select_for_update(skip_locked=True)
+            .filter(event_id=event_id, status='waitlisted')
+            .order_by('waitlisted_at', 'pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if candidate is None or not _claim_seat(event_id):
+            return promoted
+        RSVP.objects.filter(pk=candidate).update(status='going', waitlisted_at=None, updated_at=timezone.now())
+        promoted += 1
+
+
+def set_rsvp_status(event_id, user, status):
+    """Apply ``status`` ('going' or 'not_going') for ``user`` and return the stored status.
+
+    Asking for 'going' on a full event returns 'waitlisted'.
+    """
+    # Inside an outer transaction the lock cannot be retaken here, so only retry at the top level
+    lock_retries = 0 if connection.in_atomic_block else LOCK_RETRIES
+    inserted_concurrently = False
+    attempt = 0
+    while True:
+        try:
+            with transaction.atomic():
+                return _set_rsvp_status(event_id, user, status)
+        except IntegrityError:
+            # A concurrent request from the same user inserted the row first; retry as an update
+            if inserted_concurrently:
+                raise
+            inserted_concurrently = True
+        except OperationalError as e:
+            if 'locked' not in str(e) or attempt >= lock_retries:
+                raise
+            time.sleep(random.uniform(0, LOCK_BACKOFF * 2 ** attempt))
+            attempt += 1
+
+
+def _set_rsvp_status(event_id, user, status):
+    current = (
+        RSVP.objects.select_for_update()
+        .filter(event_id=event_id, user=user)
+        .values_list('pk', 'status')
+        .first()
+    )
+    pk, previous = current or (None, None)
+
+    if status == 'going':
+        if previous == 'going':
+            return previous
+        new_status = 'going' if _claim_seat(event_id) else 'waitlisted'
+        if new_status == previous:
+            # Still no seat: keep the existing waitlist position
+            return previous
+    else:
+        new_status = 'not_going'
+        if previous == new_status:
+            return previous
+
+    waitlisted_at = timezone.now() if new_status == 'waitlisted' else None
+    if pk is None:
+        RSVP.objects.bulk_create([
+            RSVP(event_id=event_id, user=user, status=new_status, waitlisted_at=waitlisted_at)
+        ])
+    else:
+        RSVP.objects.filter(pk=pk).update(status=new_status, waitlisted_at=waitlisted_at, updated_at=timezone.now())
+
+    if previous == 'going':
+        _release_seat(event_id)
+        promote_waitlist(event_id)
+    # Rows above are written without signals, so invalidate the event's cached pages here
+    caching.touch([event_id])
+    return new_status
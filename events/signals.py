@@ -0,0 +1,80 @@
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import caching
+from .models import Event, RSVP, Rating
+
+
+def _deleting_event(origin):
+    """True when the delete cascades from the Event itself (counters die with it)."""
+    if isinstance(origin, Event):
+        return True
+    return isinstance(origin, QuerySet) and origin.model is Event
+
+
+def _bump(event_id, **deltas):
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if updates:
+        Event.objects.filter(pk=event_id).update(**updates)
+
+
+@receiver(post_save, sender=RSVP)
+def update_going_count_on_save(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_status', None)
+    delta = int(instance.status == 'going') - int(previous == 'going')
+    _bump(instance.event_id, going_count=delta)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=RSVP)
+def update_going_count_on_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_event(origin):
+        return
+    status = getattr(instance, '_loaded_status', instance.status)
+    if status == 'going':
+        _bump(instance.event_id, going_count=-1)
+
+
+def _histogram_deltas(previous, current):
+    deltas = {}
+    if previous:
+        deltas[f'rating_stars_{previous}'] = -1
+    if current:
+        deltas[f'rating_stars_{current}'] = deltas.get(f'rating_stars_{current}', 0) + 1
+    return deltas
+
+
+@receiver(post_save, sender=Rating)
+def update_rating_totals_on_save(sender, instance, created, **kwargs):
+    previous = 0 if created else (getattr(instance, '_loaded_stars', None) or 0)
+    _bump(
+        instance.event_id,
+        rating_count=1 if created else 0,
+        rating_sum=instance.stars - previous,
+        **_histogram_deltas(previous, instance.stars),
+    )
+    instance._loaded_stars = instance.stars
+
+
+@receiver(post_delete, sender=Rating)
+def update_rating_totals_on_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_event(origin):
+        return
+    stars = getattr(instance, '_loaded_stars', None) or instance.stars
+    _bump(instance.event_id, rating_count=-1, rating_sum=-stars, **_histogram_deltas(stars, 0))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event_caches(sender, instance, **kwargs):
+    caching.touch([instance.pk], listing=True)
+
+
+@receiver(post_save, sender=RSVP)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=RSVP)
+@receiver(post_delete, sender=Rating)
+def invalidate_event_fragments(sender, instance, origin=None, **kwargs):
+    # RSVPs and ratings only change their own event's cards and pages
+    if not _deleting_event(origin):
+        caching.touch([instance.event_id])
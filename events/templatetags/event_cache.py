@@ -0,0 +1,43 @@
+from django import template
+
+from events import caching
+
+register = template.Library()
+
+
+@register.tag('eventcache')
+def do_eventcache(parser, token):
+    """Cache a fragment per event until that event, its RSVPs or ratings change.
+
+    Usage::
+
+        {% eventcache 'card' event [vary ...] %} ... {% endeventcache %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes at least a fragment name and an event")
+    nodelist = parser.parse(('endeventcache',))
+    parser.delete_first_token()
+    return EventCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
+
+
+class EventCacheNode(template.Node):
+    def __init__(self, nodelist, name, event, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.event = event
+        self.vary = vary
+
+    def render(self, context):
+        event = self.event.resolve(context)
+        return caching.get_or_render_fragment(
+            self.name.resolve(context),
+            event,
+            lambda: self.nodelist.render(context),
+            vary=[var.resolve(context) for var in self.vary],
+        )
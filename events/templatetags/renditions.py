@@ -0,0 +1,35 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from events import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(instance, field_name, name, **attrs):
+    """Render the ``name`` rendition of an image field as ``<picture>`` (WebP with JPEG fallback).
+
+    Falls back to the original upload until the image worker has produced the
+    renditions. Extra keyword arguments become ``<img>`` attributes, e.g.
+    ``{% picture event 'image' 'card' class='card-img-top' alt=event.title %}``.
+    """
+    field_file = getattr(instance, field_name)
+    rendition = images.rendition(instance, field_name, name)
+    attrs.setdefault('loading', 'lazy')
+    if rendition is None:
+        return format_html('<img src="{}"{}>', field_file.url, _attrs(attrs))
+
+    storage = field_file.storage
+    attrs.setdefault('width', rendition['width'])
+    attrs.setdefault('height', rendition['height'])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}"{}></picture>',
+        storage.url(rendition['webp']),
+        storage.url(rendition['jpeg']),
+        _attrs(attrs),
+    )
+
+
+def _attrs(attrs):
+    return format_html_join('', ' {}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items()))
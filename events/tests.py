@@ -1,3 +1,1288 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+import html
+import json
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+from datetime import time, timedelta
+from importlib import import_module
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import Profile
+from EventPlanner.middleware import PerformanceMiddleware, registry
+from EventPlanner.storage import MediaStorage, media_storage
+
+from . import admin as admin_module, api, caching, images, jobs, schedule, views
+from .cron import complete_due_events, remind_attendees, send_event_reminders, send_rating_requests
+from .ics import feed_token
+from .models import Event, EventJob, ImageJob, RSVP, Rating, ReminderLog
+from .pagination import KeysetPaginator
+from .search import search_events
+from .services import set_rsvp_status
+
+SCHEDULE_MIGRATION = import_module('events.migrations.0016_event_schedule_triggers')
+
+
+def make_event(creator, days=7, **kwargs):
+    defaults = {
+        'title': 'Sample event',
+        'description': 'Sample description',
+        'date': timezone.now().date() + timedelta(days=days),
+        'time': time(18, 0),
+        'location': 'Community Center',
+        'creator': creator,
+    }
+    defaults.update(kwargs)
+    return Event.objects.create(**defaults)
+
+
+class EventCounterTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass') for i in range(3)]
+        self.event = make_event(self.creator)
+
+    def test_going_count_tracks_rsvp_changes(self):
+        rsvps = [RSVP.objects.create(event=self.event, user=u, status='going') for u in self.users]
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendee_count, 3)
+
+        rsvp = RSVP.objects.get(pk=rsvps[0].pk)
+        rsvp.status = 'not_going'
+        rsvp.save()
+        rsvps[1].delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.going_count, 1)
+
+    def test_rating_totals_track_rating_changes(self):
+        ratings = [Rating.objects.create(event=self.event, user=u, stars=s) for u, s in zip(self.users, [5, 4, 3])]
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.rating_count, self.event.rating_sum), (3, 12))
+        self.assertEqual(self.event.average_rating, 4)
+
+        rating = Rating.objects.get(pk=ratings[0].pk)
+        rating.stars = 2
+        rating.save()
+        ratings[2].delete()
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.rating_count, self.event.rating_sum), (2, 6))
+        self.assertEqual([b['count'] for b in self.event.rating_histogram], [0, 1, 0, 1, 0])
+        self.assertEqual([b['percent'] for b in self.event.rating_histogram], [0, 50, 0, 50, 0])
+
+    def test_event_save_does_not_overwrite_counters(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        RSVP.objects.create(event=self.event, user=self.users[0], status='going')
+        stale.is_completed = True
+        stale.save()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.going_count, 1)
+
+    def test_rebuild_command_recomputes_counters(self):
+        RSVP.objects.create(event=self.event, user=self.users[0], status='going')
+        Rating.objects.create(event=self.event, user=self.users[0], stars=5)
+        Event.objects.update(going_count=0, rating_count=0, rating_sum=0, rating_stars_5=0)
+
+        call_command('rebuild_event_counters', stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.going_count, self.event.rating_count, self.event.rating_sum), (1, 1, 5))
+        self.assertEqual((self.event.rating_stars_5, self.event.rating_stars_4), (1, 0))
+
+    def test_organizer_summary_reads_counters(self):
+        for days in (-3, -4):
+            event = make_event(self.creator, days=days)
+            for user, stars in zip(self.users, [5, 4, 4]):
+                Rating.objects.create(event=event, user=user, stars=stars)
+        self.client.force_login(self.creator)
+        self.client.get(reverse('organizer-summary'))
+        with self.assertNumQueries(5):  # session, user with profile, totals, page count, page
+            response = self.client.get(reverse('organizer-summary'))
+        totals = response.context['totals']
+        self.assertEqual((totals['events'], totals['ratings']), (3, 6))
+        self.assertEqual([b['count'] for b in totals['histogram']], [2, 4, 0, 0, 0])
+        self.assertContains(response, '4.3 (3)')
+
+
+class RSVPServiceTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass') for i in range(3)]
+        self.event = make_event(self.creator, capacity=1)
+
+    def test_overflow_goes_to_waitlist_and_is_promoted(self):
+        self.assertEqual(set_rsvp_status(self.event.pk, self.users[0], 'going'), 'going')
+        self.assertEqual(set_rsvp_status(self.event.pk, self.users[1], 'going'), 'waitlisted')
+        self.assertEqual(set_rsvp_status(self.event.pk, self.users[2], 'going'), 'waitlisted')
+
+        self.assertEqual(set_rsvp_status(self.event.pk, self.users[0], 'not_going'), 'not_going')
+        self.assertEqual(RSVP.objects.get(event=self.event, user=self.users[1]).status, 'going')
+        self.assertEqual(RSVP.objects.get(event=self.event, user=self.users[2]).status, 'waitlisted')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.going_count, 1)
+
+    def test_rsvp_view_uses_capacity(self):
+        set_rsvp_status(self.event.pk, self.users[0], 'going')
+        self.client.force_login(self.users[1])
+        self.client.post(reverse('event-rsvp', args=[self.event.pk]), {'status': 'going'})
+        self.assertEqual(RSVP.objects.get(event=self.event, user=self.users[1]).status, 'waitlisted')
+
+
+class ConcurrentRSVPTests(TransactionTestCase):
+    def test_parallel_rsvps_never_exceed_capacity(self):
+        creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        users = User.objects.bulk_create([User(username=f'load{i}') for i in range(200)])
+        event = make_event(creator, capacity=25)
+
+        def attempt(user):
+            try:
+                return set_rsvp_status(event.pk, user, 'going')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(attempt, users))
+
+        event.refresh_from_db()
+        self.assertEqual(results.count('going'), 25)
+        self.assertEqual(results.count('waitlisted'), 175)
+        self.assertEqual(event.going_count, 25)
+        self.assertEqual(RSVP.objects.filter(event=event, status='going').count(), 25)
+
+
+class AutoCompleteTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+
+    def test_completes_due_events_in_chunks(self):
+        due = [make_event(self.creator, days=-3, auto_complete_days=1) for _ in range(5)]
+        pending = make_event(self.creator, days=3, auto_complete_days=1)
+
+        stats = complete_due_events(chunk_size=2)
+        self.assertEqual((stats['completed'], stats['chunks']), (5, 3))
+        self.assertEqual(Event.objects.filter(is_completed=True).count(), len(due))
+        pending.refresh_from_db()
+        self.assertFalse(pending.is_completed)
+
+    def test_status_only_save_skips_image_processing(self):
+        event = Event.objects.get(pk=make_event(self.creator).pk)
+        with mock.patch.object(images, 'enqueue') as enqueue:
+            event.is_completed = True
+            event.save(update_fields=['is_completed', 'updated_at'])
+            event.title = 'Renamed'
+            event.save()
+        enqueue.assert_not_called()
+
+
+class ReminderMailerTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.users = [User.objects.create_user(f'user{i}', f'user{i}@example.com', 'pass') for i in range(5)]
+
+    def test_reminders_are_batched_logged_and_not_resent(self):
+        event = make_event(self.creator, days=2)
+        for user in self.users:
+            RSVP.objects.create(event=event, user=user, status='going')
+        ReminderLog.objects.create(event=event, user=self.users[0], reminder_type='pre_event')
+
+        with self.assertNumQueries(2), redirect_stdout(StringIO()):
+            stats = send_event_reminders(batch_size=2, workers=2)
+        self.assertEqual(stats['sent'], 4)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(ReminderLog.objects.filter(event=event, reminder_type='pre_event').count(), 5)
+
+        with redirect_stdout(StringIO()):
+            self.assertEqual(send_event_reminders()['sent'], 0)
+
+    def test_rating_requests_skip_users_who_rated(self):
+        event = make_event(self.creator, days=-1)
+        for user in self.users[:3]:
+            RSVP.objects.create(event=event, user=user, status='going')
+        Rating.objects.create(event=event, user=self.users[0], stars=4)
+
+        with redirect_stdout(StringIO()):
+            stats = send_rating_requests()
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['user1@example.com', 'user2@example.com'])
+
+
+class EventJobTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('attendee', 'attendee@example.com', 'pass')
+
+    def due(self, event):
+        return dict(EventJob.objects.filter(event=event, status='pending').values_list('kind', 'due_at'))
+
+    def test_jobs_follow_the_schedule(self):
+        event = make_event(self.creator, days=7, duration_hours=3, auto_complete_days=1)
+        self.assertEqual(self.due(event), {
+            'event_reminder': event.start_datetime - timedelta(hours=48),
+            'rating_request': event.end_datetime,
+            'auto_complete': event.auto_complete_datetime,
+        })
+
+        event.title = 'Renamed'
+        event.save()
+        self.assertEqual(EventJob.objects.filter(event=event).count(), 3)
+
+        event.date += timedelta(days=1)
+        event.save()
+        self.assertEqual(self.due(event)['rating_request'], event.end_datetime)
+        self.assertEqual(EventJob.objects.filter(event=event).count(), 3)
+
+        # Completing by hand leaves the job queued; it does nothing once the event is completed
+        event.is_completed = True
+        event.save(update_fields=['is_completed', 'updated_at'])
+        self.assertIn('auto_complete', self.due(event))
+
+    def test_undone_completion_stays_undone(self):
+        event = make_event(self.creator, days=-3, auto_complete_hours=1)
+        jobs.run()
+        self.assertTrue(Event.objects.get(pk=event.pk).is_completed)
+
+        self.client.force_login(self.creator)
+        self.client.get(reverse('event-undo-complete', args=[event.pk]))
+        self.assertFalse(Event.objects.get(pk=event.pk).is_completed)
+        jobs.run()
+        self.assertFalse(Event.objects.get(pk=event.pk).is_completed)
+
+    def test_worker_runs_due_jobs_once(self):
+        soon = make_event(self.creator, days=1)
+        RSVP.objects.create(event=soon, user=self.user, status='going')
+        past = make_event(self.creator, days=-3, auto_complete_hours=1)
+        later = make_event(self.creator, days=30)
+
+        self.assertEqual(jobs.run(), {'done': 2, 'retried': 0, 'failed': 0})
+        self.assertEqual([m.to for m in mail.outbox], [['attendee@example.com']])
+        self.assertTrue(Event.objects.get(pk=past.pk).is_completed)
+        self.assertEqual(set(EventJob.objects.values_list('event_id', 'kind')), {
+            (soon.pk, 'rating_request'),
+            (later.pk, 'event_reminder'),
+            (later.pk, 'rating_request'),
+        })
+        self.assertEqual(jobs.run()['done'], 0)
+
+    def test_claimed_jobs_are_not_handed_out_twice(self):
+        make_event(self.creator, days=1)
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_failures_are_retried_with_backoff(self):
+        event = make_event(self.creator, days=1)
+        with mock.patch('events.cron.remind_attendees', side_effect=RuntimeError('smtp down')):
+            self.assertEqual(jobs.run()['retried'], 1)
+        job = EventJob.objects.get(event=event, kind='event_reminder')
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'RuntimeError: smtp down'))
+        self.assertGreater(job.due_at, timezone.now())
+        self.assertEqual(jobs.run()['done'], 0)
+
+        job.attempts = jobs.MAX_ATTEMPTS - 1
+        job.due_at = timezone.now()
+        job.save()
+        with mock.patch('events.cron.remind_attendees', side_effect=RuntimeError('smtp down')):
+            self.assertEqual(jobs.run()['failed'], 1)
+        self.assertEqual(EventJob.objects.get(pk=job.pk).status, 'failed')
+
+    def test_failed_sends_fail_the_job(self):
+        event = make_event(self.creator, days=1)
+        RSVP.objects.create(event=event, user=self.user, status='going')
+        with mock.patch('events.mailer._send_batch', side_effect=SMTPException('smtp down')), redirect_stdout(StringIO()):
+            self.assertEqual(jobs.run()['retried'], 1)
+        job = EventJob.objects.get(event=event, kind='event_reminder')
+        self.assertEqual(job.status, 'pending')
+        self.assertIn('smtp down', job.last_error)
+        self.assertFalse(ReminderLog.objects.exists())
+
+        EventJob.objects.filter(pk=job.pk).update(due_at=timezone.now())
+        self.assertEqual(jobs.run()['done'], 1)
+        self.assertEqual([m.to for m in mail.outbox], [['attendee@example.com']])
+
+    def test_abandoned_jobs_count_as_failed_attempts(self):
+        event = make_event(self.creator, days=1)
+        job, = jobs.claim(10)
+        jobs.reclaim_stale(timezone.now())
+        self.assertEqual(EventJob.objects.get(pk=job.pk).status, 'running')
+
+        # The worker hung or died mid-job
+        stale = timezone.now() - jobs.LOCK_TIMEOUT - timedelta(minutes=1)
+        EventJob.objects.filter(pk=job.pk).update(locked_at=stale)
+        jobs.reclaim_stale(timezone.now())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertIn('TimeoutError', job.last_error)
+        self.assertGreater(job.due_at, timezone.now())
+
+        EventJob.objects.filter(pk=job.pk).update(status='running', attempts=jobs.MAX_ATTEMPTS, locked_at=stale)
+        jobs.reclaim_stale(timezone.now())
+        self.assertEqual(EventJob.objects.get(event=event, kind='event_reminder').status, 'failed')
+
+    def test_reminder_says_how_long_until_the_event(self):
+        start = timezone.localtime() + timedelta(hours=3, minutes=30)
+        event = make_event(self.creator, date=start.date(), time=start.time().replace(microsecond=0))
+        RSVP.objects.create(event=event, user=self.user, status='going')
+        remind_attendees(event.pk)
+        self.assertEqual(mail.outbox[0].subject, 'Reminder: Sample event is in 3\xa0hours!')
+        self.assertIn('starts in 3\xa0hours', mail.outbox[0].body)
+
+
+@skipUnless(schedule.supported(connection.vendor), 'schedule triggers need PostgreSQL or SQLite in UTC')
+class EventScheduleTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+
+    def stored(self, event):
+        return Event.objects.values_list('end_datetime', 'auto_complete_datetime').get(pk=event.pk)
+
+    def test_updates_that_bypass_save_recompute_the_schedule(self):
+        event = make_event(self.creator, duration_hours=2)
+        start = event.start_datetime
+
+        Event.objects.filter(pk=event.pk).update(duration_hours=5, auto_complete_days=1)
+        self.assertEqual(self.stored(event), (start + timedelta(hours=5), start + timedelta(days=1)))
+
+        Event.objects.filter(pk=event.pk).update(auto_complete_days=0, end_datetime=None)
+        self.assertEqual(self.stored(event), (start + timedelta(hours=5), None))
+
+    def test_bulk_create_gets_a_schedule(self):
+        event, = Event.objects.bulk_create([Event(
+            title='Imported', description='-', location='-', creator=self.creator,
+            date=timezone.now().date(), time=time(9, 30), duration_days=1, auto_complete_hours=3,
+        )])
+        start = event.start_datetime
+        self.assertEqual(self.stored(event), (start + timedelta(days=1), start + timedelta(hours=3)))
+
+    def test_backfill_fixes_rows_written_without_the_triggers(self):
+        events = [make_event(self.creator, days=i, duration_hours=2, auto_complete_hours=1) for i in range(5)]
+        expected = {event.pk: self.stored(event) for event in events}
+        SCHEDULE_MIGRATION.uninstall_schedule_triggers(None, connection.schema_editor())
+        Event.objects.filter(pk__in=[e.pk for e in events[:3]]).update(end_datetime=None, auto_complete_datetime=None)
+        SCHEDULE_MIGRATION.install_schedule_triggers(None, connection.schema_editor())
+
+        out = StringIO()
+        call_command('backfill_event_schedule', chunk_size=2, stdout=out)
+        self.assertIn('Backfilled the schedule of 3 event(s)', out.getvalue())
+        self.assertEqual({event.pk: self.stored(event) for event in events}, expected)
+
+        out = StringIO()
+        call_command('backfill_event_schedule', stdout=out)
+        self.assertIn('Backfilled the schedule of 0 event(s)', out.getvalue())
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'EXPLAIN output is checked for SQLite and PostgreSQL only')
+class HotQueryPlanTests(TestCase):
+    """Each hot query must be answered from an index, not a full table scan."""
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be seq-scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset):
+        """The query seeks into an index (SQLite ``SEARCH ... USING INDEX``) rather than scanning."""
+        plan = self.explain(queryset)
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'\bSEARCH \S+ USING (COVERING )?INDEX\b', plan)
+            self.assertNotRegex(plan, r'\bSCAN\b|TEMP B-TREE', plan)
+        else:
+            self.assertRegex(plan, r'\bIndex (Only )?Scan\b|\bBitmap Index Scan\b', plan)
+            self.assertNotRegex(plan, r'\bSeq Scan\b|\bSort\b', plan)
+
+    def test_event_list_first_page(self):
+        # Unfiltered, so the first page walks the index in order and stops after the page
+        plan = self.explain(Event.objects.order_by('date', 'time', 'id')[:7])
+        if connection.vendor == 'sqlite':
+            self.assertRegex(plan, r'\bSCAN \S+ USING (COVERING )?INDEX event_date_time_id_idx\b', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+        else:
+            self.assertRegex(plan, r'\bIndex (Only )?Scan\b', plan)
+            self.assertNotRegex(plan, r'\bSeq Scan\b|\bSort\b', plan)
+
+    def test_event_list_keyset_seek(self):
+        paginator = KeysetPaginator(Event.objects.all(), 6)
+        cursor = paginator.encode_cursor({'date': timezone.now().date(), 'time': time(12, 0), 'id': 10})
+        values, forward = paginator.decode_cursor(cursor)
+        seek = Event.objects.filter(paginator._seek(values, forward)).order_by('date', 'time', 'id')[:7]
+        self.assertUsesIndex(seek)
+
+    def test_completed_events(self):
+        # Each arm of is_completed OR ended walks its own index for one page; only those rows are sorted
+        view = views.CompletedEventsView(request=RequestFactory().get('/completed/'))
+        view.request.user = AnonymousUser()
+        paginator = KeysetPaginator(view.get_queryset(), 6, descending=True, branches=view.get_keyset_branches())
+        values, forward = paginator.decode_cursor(
+            paginator.encode_cursor({'date': timezone.now().date(), 'time': time(12, 0), 'id': 10})
+        )
+        for page in (paginator._page_queryset(None, True), paginator._page_queryset(values, forward)):
+            plan = self.explain(page)
+            if connection.vendor == 'sqlite':
+                self.assertRegex(plan, r'\bUSING INDEX event_completed_keyset_idx\b', plan)
+                self.assertRegex(plan, r'\bSEARCH \S+ USING INDEX event_date_time_id_idx \(date<\?\)', plan)
+                self.assertNotRegex(plan, r'\bSCAN \S+(?! USING (COVERING )?INDEX)\b', plan)
+            else:
+                self.assertRegex(plan, r'\bIndex (Only )?Scan\b', plan)
+                self.assertNotRegex(plan, r'\bSeq Scan\b', plan)
+
+    def test_cron_date_lookup(self):
+        self.assertUsesIndex(Event.objects.filter(date=timezone.now().date()))
+
+    def test_auto_complete_sweep(self):
+        due = Event.objects.filter(auto_complete_datetime__lte=timezone.now(), is_completed=False)
+        self.assertUsesIndex(due.order_by('auto_complete_datetime').values_list('pk', flat=True)[:1000])
+
+    def test_reminder_dedup(self):
+        self.assertUsesIndex(ReminderLog.objects.filter(event_id=1, user_id=1, reminder_type='pre_event'))
+
+    def test_going_attendees(self):
+        self.assertUsesIndex(RSVP.objects.filter(event_id=1, status='going'))
+
+
+class ListQueryCountTests(TestCase):
+    """Pin the list views to a constant number of queries regardless of page size or history."""
+
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+
+    def add_history(self, count):
+        for i in range(count):
+            event = make_event(self.creator, days=-(i + 2), title=f'Past {i}')
+            RSVP.objects.create(event=event, user=self.user, status='going' if i % 2 else 'not_going')
+            if i % 3 == 0:
+                Rating.objects.create(event=event, user=self.user, stars=4)
+            upcoming = make_event(self.creator, days=i + 2, title=f'Upcoming {i}')
+            RSVP.objects.create(event=upcoming, user=self.user, status='going')
+
+    def assertConstantQueries(self, url, num, sizes=(1, 12)):
+        for size in sizes:
+            with self.subTest(history=size):
+                self.add_history(size)
+                with self.assertNumQueries(num):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_completed_events_anonymous(self):
+        self.assertConstantQueries(reverse('completed-events'), 1)
+
+    def test_completed_events_authenticated(self):
+        self.client.force_login(self.user)
+        # session + user with profile + page (keyset pages need no COUNT)
+        self.assertConstantQueries(reverse('completed-events'), 3)
+
+    def test_my_rsvps(self):
+        self.client.force_login(self.user)
+        # session + user with profile + (count + page) per list
+        self.assertConstantQueries(reverse('my-rsvps'), 6)
+
+    def test_my_rsvps_pagination_links(self):
+        self.add_history(12)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('my-rsvps'))
+        past_next = re.search(r'href="([^"]*past_page=2[^"]*)"', response.content.decode()).group(1)
+
+        response = self.client.get(reverse('my-rsvps') + html.unescape(past_next))
+        self.assertEqual(response.context['past_rsvps'].number, 2)
+        self.assertEqual(response.context['upcoming_rsvps'].number, 1)
+        # Paging the other list keeps this one where it is
+        upcoming_next = re.search(r'href="([^"]*upcoming_page=2[^"]*)"', response.content.decode()).group(1)
+        response = self.client.get(reverse('my-rsvps') + html.unescape(upcoming_next))
+        self.assertEqual(response.context['upcoming_rsvps'].number, 2)
+        self.assertEqual(response.context['past_rsvps'].number, 2)
+
+    def test_completed_events_can_rate(self):
+        self.add_history(3)
+        self.client.force_login(self.user)
+        events = {e.title: e for e in self.client.get(reverse('completed-events')).context['events']}
+        self.assertIsNotNone(events['Past 0'].user_rating)
+        self.assertFalse(events['Past 0'].can_rate)
+        self.assertTrue(events['Past 1'].can_rate)
+        self.assertFalse(events['Past 2'].can_rate)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.inside = make_event(self.creator, days=3, title='Inside')
+        self.outside = make_event(self.creator, days=60, title='Outside')
+        today = timezone.now().date()
+        self.window = {'start': f'{today}T00:00:00Z', 'end': f'{today + timedelta(days=30)}T00:00:00Z'}
+
+    def test_window_filters_events(self):
+        response = self.client.get(reverse('calendar-events-api'), self.window)
+        self.assertEqual([e['title'] for e in response.json()], ['Inside'])
+        self.assertEqual(response.json()[0]['url'], self.inside.get_absolute_url())
+
+    def test_conditional_get_returns_not_modified(self):
+        url = reverse('calendar-events-api')
+        first = self.client.get(url, self.window)
+        with self.assertNumQueries(1):
+            second = self.client.get(url, self.window, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+        self.inside.title = 'Renamed'
+        self.inside.save()
+        third = self.client.get(url, self.window, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], first['ETag'])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+        self.event = make_event(self.creator, capacity=1, title='Async')
+
+    def test_views_are_native_coroutines(self):
+        for view in (views.rsvp_event, views.calendar_events_api, api.event_detail):
+            self.assertTrue(iscoroutinefunction(view), view)
+
+    async def test_rsvp(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse('event-rsvp', args=[self.event.pk]), {'status': 'going'})
+        self.assertRedirects(response, self.event.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual(await RSVP.objects.filter(event=self.event, user=self.user).values_list('status', flat=True).aget(), 'going')
+        self.assertEqual((await Event.objects.aget(pk=self.event.pk)).going_count, 1)
+
+    async def test_event_detail_api(self):
+        url = reverse('api-v1-event', args=[self.event.pk])
+        params = {'fields': 'title,going_count', 'include': 'counts,viewer'}
+        data = (await self.async_client.get(url, params)).json()
+        self.assertEqual((data['title'], data['going_count'], data['viewer_rsvp_status']), ('Async', 0, None))
+
+        await RSVP.objects.acreate(event=self.event, user=self.creator, status='going')
+        await RSVP.objects.acreate(event=self.event, user=self.user, status='waitlisted', waitlisted_at=timezone.now())
+        await self.async_client.aforce_login(self.user)
+        data = (await self.async_client.get(url, params)).json()
+        self.assertEqual((data['going_count'], data['counts']['waitlisted'], data['viewer_rsvp_status']), (1, 1, 'waitlisted'))
+
+        missing = await self.async_client.get(reverse('api-v1-event', args=[self.event.pk + 100]))
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual((await self.async_client.get(url, {'fields': 'password'})).status_code, 400)
+
+    async def test_calendar_feed(self):
+        response = await self.async_client.get(reverse('calendar-events-api'))
+        self.assertEqual([e['title'] for e in response.json()], ['Async'])
+        again = await self.async_client.get(reverse('calendar-events-api'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+
+class ApiV1Tests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+        self.events = [make_event(self.creator, days=d, title=f'Event {d}') for d in (1, 2, 3)]
+        self.past = make_event(self.creator, days=-3, title='Past')
+
+    def post_json(self, name, data, args=()):
+        return self.client.post(reverse(name, args=args), json.dumps(data), content_type='application/json')
+
+    def test_list_sparse_fields_and_keyset_pages(self):
+        url = reverse('api-v1-events')
+        first = self.client.get(url, {'fields': 'title', 'page_size': 2, 'date_from': timezone.now().date()}).json()
+        self.assertEqual(first['results'], [{'title': 'Event 1'}, {'title': 'Event 2'}])
+        second = self.client.get(url, {'fields': 'title', 'page_size': 2, 'cursor': first['next']}).json()
+        self.assertEqual(second['results'], [{'title': 'Event 3'}])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get(url, {'fields': 'password'}).status_code, 400)
+
+    def test_includes_use_one_query_each(self):
+        RSVP.objects.create(event=self.events[0], user=self.user, status='going')
+        RSVP.objects.create(event=self.events[0], user=self.creator, status='not_going')
+        self.client.force_login(self.user)
+        self.client.get(reverse('api-v1-events'))  # warm the session and search backend
+        with self.assertNumQueries(5):  # session, user, page, counts, viewer
+            data = self.client.get(reverse('api-v1-events'), {
+                'fields': 'id', 'include': 'counts,viewer', 'date_from': timezone.now().date(),
+            }).json()
+        first = data['results'][0]
+        self.assertEqual(first['counts'], {'going': 1, 'not_going': 1, 'waitlisted': 0})
+        self.assertEqual(first['viewer_rsvp_status'], 'going')
+        self.assertIsNone(data['results'][1]['viewer_rsvp_status'])
+
+    def test_detail_etag(self):
+        url = reverse('api-v1-event', args=[self.past.pk])
+        response = self.client.get(url, {'include': 'rating'})
+        self.assertEqual(response.json()['rating'], {'count': 0, 'average': None, 'histogram': {str(i): 0 for i in range(1, 6)}})
+        again = self.client.get(url, {'include': 'rating'}, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get(reverse('api-v1-event', args=[self.past.pk + 100])).status_code, 404)
+
+    def test_rsvp(self):
+        url_args = [self.events[0].pk]
+        self.assertEqual(self.post_json('api-v1-event-rsvp', {'status': 'going'}, url_args).status_code, 401)
+        self.client.force_login(self.user)
+        response = self.post_json('api-v1-event-rsvp', {'status': 'going'}, url_args)
+        self.assertEqual(response.json(), {'event': self.events[0].pk, 'status': 'going'})
+        self.assertEqual(Event.objects.get(pk=self.events[0].pk).going_count, 1)
+        self.assertEqual(self.post_json('api-v1-event-rsvp', {'status': 'maybe'}, url_args).status_code, 400)
+        self.assertEqual(self.post_json('api-v1-event-rsvp', {'status': 'going'}, [self.past.pk]).status_code, 409)
+
+    def test_bulk_rsvp_is_all_or_nothing(self):
+        self.client.force_login(self.user)
+        rsvps = [{'event': e.pk, 'status': 'going'} for e in self.events]
+        response = self.post_json('api-v1-rsvps-bulk', {'rsvps': rsvps + [{'event': self.past.pk, 'status': 'going'}]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(list(response.json()['errors']), ['3'])
+        self.assertFalse(RSVP.objects.filter(user=self.user).exists())
+
+        response = self.post_json('api-v1-rsvps-bulk', {'rsvps': rsvps})
+        self.assertEqual([r['status'] for r in response.json()['results']], ['going'] * 3)
+        self.assertEqual(RSVP.objects.filter(user=self.user, status='going').count(), 3)
+
+    def test_rating(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.post_json('api-v1-event-rating', {'stars': 5}, [self.past.pk]).status_code, 403)
+        RSVP.objects.create(event=self.past, user=self.user, status='going')
+        self.assertEqual(self.post_json('api-v1-event-rating', {'stars': 6}, [self.past.pk]).status_code, 400)
+        self.assertEqual(self.post_json('api-v1-event-rating', {'stars': 4}, [self.past.pk]).status_code, 201)
+        self.assertEqual(self.post_json('api-v1-event-rating', {'stars': 2}, [self.past.pk]).status_code, 200)
+        self.assertEqual(Rating.objects.get(event=self.past, user=self.user).stars, 2)
+        self.assertEqual(self.post_json('api-v1-event-rating', {'stars': 4}, [self.events[0].pk]).status_code, 409)
+
+
+    def test_non_object_bodies_are_rejected(self):
+        self.client.force_login(self.user)
+        RSVP.objects.create(event=self.past, user=self.user, status='going')
+        for name, args in (
+            ('api-v1-event-rsvp', [self.events[0].pk]),
+            ('api-v1-rsvps-bulk', []),
+            ('api-v1-event-rating', [self.past.pk]),
+        ):
+            for body in ([1, 2], 'x', 3, None):
+                with self.subTest(name=name, body=body):
+                    response = self.post_json(name, body, args)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': 'Request body must be a JSON object'})
+
+
+class ICSFeedTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+        self.event = make_event(self.creator, days=3, title='Launch; party, again', description='Line one\nLine two ' * 10)
+        self.other = make_event(self.creator, days=4, title='Other')
+        RSVP.objects.create(event=self.event, user=self.user, status='going')
+
+    def read(self, response):
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        return b''.join(response.streaming_content).decode()
+
+    def test_upcoming_feed_streams_all_upcoming_events(self):
+        body = self.read(self.client.get(reverse('upcoming-events-ics')))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn(r'SUMMARY:Launch\; party\, again', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_single_event_feed(self):
+        body = self.read(self.client.get(reverse('event-ics', args=[self.event.pk])))
+        self.assertIn(f'UID:event-{self.event.pk}@', body)
+        self.assertEqual(self.client.get(reverse('event-ics', args=[9999])).status_code, 404)
+
+    def test_private_feed_requires_valid_token(self):
+        url = reverse('my-rsvps-ics', args=[feed_token(self.user.pk)])
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        body = self.read(response)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.client.get(reverse('my-rsvps-ics', args=['forged'])).status_code, 404)
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_private_feed_changes_when_an_rsvp_is_swapped(self):
+        # Same event count and the same newest event timestamp before and after the swap
+        Event.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        url = reverse('my-rsvps-ics', args=[feed_token(self.user.pk)])
+        response = self.client.get(url)
+
+        set_rsvp_status(self.event.pk, self.user, 'not_going')
+        set_rsvp_status(self.other.pk, self.user, 'going')
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertIn('SUMMARY:Other', self.read(again))
+
+
+class EventSearchTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.robotics = make_event(self.creator, title='Robotics workshop', location='Lab 3',
+                                   description='Build a line follower')
+        self.webdev = make_event(self.creator, title='Web development night', location='Main hall',
+                                 description='Django and friends')
+
+    def titles(self, query, **kwargs):
+        return sorted(e.title for e in search_events(Event.objects.all(), query, **kwargs))
+
+    def test_matches_title_description_and_location_prefixes(self):
+        self.assertEqual(self.titles('robot'), ['Robotics workshop'])
+        self.assertEqual(self.titles('djan'), ['Web development night'])
+        self.assertEqual(self.titles('main hall'), ['Web development night'])
+        self.assertEqual(self.titles('"; DROP'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.webdev.title = 'Robot battle'
+        self.webdev.save()
+        self.assertEqual(self.titles('robot'), ['Robot battle', 'Robotics workshop'])
+        self.robotics.delete()
+        self.assertEqual(self.titles('robot'), ['Robot battle'])
+
+    def test_rank_annotation_and_list_views(self):
+        ranked = search_events(Event.objects.all(), 'robotics', rank=True).order_by('-search_rank')
+        self.assertEqual(ranked[0], self.robotics)
+        response = self.client.get(reverse('events-home'), {'search': 'robot'})
+        self.assertEqual([e.title for e in response.context['events']], ['Robotics workshop'])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        # Several events share a (date, time) so the id tie-breaker matters
+        self.events = [make_event(creator, days=1 + i // 3, title=f'Event {i}') for i in range(8)]
+
+    def walk(self, paginator):
+        titles, page = [], paginator.page()
+        while True:
+            titles.append([e.title for e in page])
+            if not page.has_next():
+                return titles, page
+            page = paginator.page(page.next_cursor)
+
+    def test_forward_and_backward(self):
+        paginator = KeysetPaginator(Event.objects.all(), 3)
+        pages, last = self.walk(paginator)
+        self.assertEqual(sum(pages, []), [f'Event {i}' for i in range(8)])
+        self.assertEqual(len(pages), 3)
+        previous = paginator.page(last.previous_cursor)
+        self.assertEqual([e.title for e in previous], pages[1])
+        self.assertTrue(previous.has_next() and previous.has_previous())
+        self.assertFalse(paginator.page(previous.previous_cursor).has_previous())
+
+    def test_descending_and_invalid_cursor(self):
+        paginator = KeysetPaginator(Event.objects.all(), 5, descending=True)
+        pages, _ = self.walk(paginator)
+        self.assertEqual(sum(pages, []), [f'Event {i}' for i in (7, 6, 5, 4, 3, 2, 1, 0)])
+        self.assertEqual([e.title for e in paginator.page('not-a-cursor')], pages[0])
+
+    def test_list_view_and_api_follow_cursors(self):
+        first = self.client.get(reverse('events-home'))
+        self.assertEqual(len(first.context['events']), 6)
+        second = self.client.get(reverse('events-home'), {'cursor': first.context['page_obj'].next_cursor})
+        self.assertEqual([e.title for e in second.context['events']], ['Event 6', 'Event 7'])
+
+        data = self.client.get(reverse('api-v1-events'), {'fields': 'title', 'page_size': 5}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['previous'])
+        rest = self.client.get(reverse('api-v1-events'), {'fields': 'title', 'page_size': 5, 'cursor': data['next']}).json()
+        self.assertEqual([e['title'] for e in rest['results']], ['Event 5', 'Event 6', 'Event 7'])
+        self.assertIsNone(rest['next'])
+
+    def test_branches_page_like_the_filter_they_split(self):
+        creator = self.events[0].creator
+        for i in range(5):
+            make_event(creator, days=-1 - i // 3, title=f'Past {i}')
+        # Completed before they took place: only the is_completed branch finds these
+        Event.objects.filter(title__in=['Event 1', 'Event 7']).update(is_completed=True)
+        view = views.CompletedEventsView(request=RequestFactory().get('/completed/'))
+        view.request.user = AnonymousUser()
+        queryset = view.get_queryset()
+
+        expected, _ = self.walk(KeysetPaginator(queryset, 3, descending=True))
+        paginator = KeysetPaginator(queryset, 3, descending=True, branches=view.get_keyset_branches())
+        pages, last = self.walk(paginator)
+        self.assertEqual(pages, expected)
+        self.assertEqual(sum(pages, []), ['Event 7', 'Event 1', 'Past 2', 'Past 1', 'Past 0', 'Past 4', 'Past 3'])
+        self.assertEqual([e.title for e in paginator.page(last.previous_cursor)], pages[-2])
+
+        response = self.client.get(reverse('completed-events'))
+        self.assertEqual([e.title for e in response.context['events']], sum(pages, [])[:6])
+
+
+def make_upload(color='red', size=(1600, 1000), name='upload.png'):
+    buffer = BytesIO()
+    Image.new('RGBA', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.event = make_event(self.creator, image=make_upload())
+
+    def tearDown(self):
+        for event in Event.objects.all():
+            storage = event.image.storage
+            for entry in event.image_renditions.values():
+                for path in (entry['webp'], entry['jpeg']):
+                    if storage.exists(path):
+                        storage.delete(path)
+            if not images.is_default(event, 'image'):
+                event.image.delete(save=False)
+
+    def test_save_queues_job_instead_of_resizing(self):
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.image_renditions, {})
+        self.assertEqual(ImageJob.objects.filter(object_id=self.event.pk, status='pending').count(), 1)
+        # The original is stored untouched
+        with Image.open(self.event.image.path) as img:
+            self.assertEqual(img.size, (1600, 1000))
+
+        self.event.title = 'Renamed'
+        self.event.save()
+        self.event.is_completed = True
+        self.event.save(update_fields=['is_completed', 'updated_at'])
+        self.assertEqual(ImageJob.objects.count(), 1)
+        self.assertEqual(ImageJob.objects.filter(model_label='events.Event').exclude(object_id=self.event.pk).count(), 0)
+
+    def test_abandoned_jobs_are_reclaimed(self):
+        job, = images.claim(10)
+        images.reclaim_stale(timezone.now())
+        self.assertEqual(ImageJob.objects.get(pk=job.pk).status, 'running')
+
+        # The worker died mid-render
+        ImageJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - images.LOCK_TIMEOUT - timedelta(minutes=1))
+        self.assertEqual(images.run()['processed'], 1)
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_abandoned_jobs_fail_once_out_of_attempts(self):
+        job, = images.claim(10)
+        ImageJob.objects.filter(pk=job.pk).update(
+            attempts=images.MAX_ATTEMPTS, updated_at=timezone.now() - images.LOCK_TIMEOUT - timedelta(minutes=1)
+        )
+        images.reclaim_stale(timezone.now())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('TimeoutError', job.last_error)
+
+    def test_worker_writes_renditions_and_skips_unchanged(self):
+        self.assertEqual(images.run()['processed'], 1)
+        self.assertFalse(ImageJob.objects.exists())
+        self.event.refresh_from_db()
+        card = self.event.card_image
+        self.assertEqual((card['width'], card['height']), (600, 400))
+        self.assertTrue(card['webp'].endswith('.webp') and card['jpeg'].endswith('.jpeg'))
+        with Image.open(self.event.image.storage.path(self.event.detail_image['jpeg'])) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', (1200, 750)))
+
+        images.enqueue(self.event, 'image')
+        self.assertEqual(images.run()['unchanged'], 1)
+
+        # Identical bytes under a new name reuse the existing rendition files
+        other = make_event(self.creator, image=make_upload(name='copy.png'))
+        images.run()
+        other.refresh_from_db()
+        self.assertEqual(other.image_renditions, self.event.image_renditions)
+
+    def test_replacing_image_resets_renditions(self):
+        images.run()
+        self.event.refresh_from_db()
+        self.event.image.delete(save=False)
+        self.event.image = make_upload('blue')
+        self.event.save()
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.image_hash, self.event.image_renditions), ('', {}))
+        images.run()
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.image_hash)
+
+    def test_templates_prefer_renditions(self):
+        response = self.client.get(reverse('events-home'))
+        self.assertContains(response, f'src="{self.event.image.url}"')
+        images.run()
+        response = self.client.get(reverse('events-home'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertNotContains(response, f'src="{self.event.image.url}"')
+
+    def test_avatar_thumb_url_follows_renditions(self):
+        profile = self.creator.profile
+        self.assertEqual(profile.avatar_thumb_url, profile.avatar.url)
+        profile.avatar = make_upload(size=(400, 400), name='avatar.png')
+        profile.save()
+        self.addCleanup(profile.avatar.delete, save=False)
+        self.assertEqual(profile.avatar_thumb_url, profile.avatar.url)
+
+        images.run()
+        profile.refresh_from_db()
+        thumb_path = profile.avatar_thumb['jpeg']
+        for entry in profile.avatar_renditions.values():
+            self.addCleanup(profile.avatar.storage.delete, entry['webp'])
+            self.addCleanup(profile.avatar.storage.delete, entry['jpeg'])
+        self.assertEqual(profile.avatar_thumb_url, profile.avatar.storage.url(thumb_path))
+
+        # The sidebar renders it from the joined user row, with no profile query of its own
+        self.client.force_login(self.creator)
+        with self.assertNumQueries(3):  # session, user with profile, page
+            response = self.client.get(reverse('completed-events'))
+        self.assertContains(response, f'src="{profile.avatar_thumb_url}"')
+
+
+class MediaServeTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.write('event_pics/photo.png', b'0123456789' * 10)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('media', args=[name]), headers=headers)
+
+    def test_validators_and_conditional_get(self):
+        response = self.get('event_pics/photo.png')
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789' * 10)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertEqual(self.get('event_pics/photo.png', if_none_match=response['ETag']).status_code, 304)
+
+    def test_content_hashed_names_are_immutable(self):
+        self.write('renditions/0123456789abcdef-600x400c.webp', b'webp')
+        response = self.get('renditions/0123456789abcdef-600x400c.webp')
+        self.assertEqual(response['ETag'], '"0123456789abcdef"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+    def test_uploads_with_hash_like_names_are_not_immutable(self):
+        self.write('event_pics/0123456789abcdef-x.jpg', b'jpeg')
+        response = self.get('event_pics/0123456789abcdef-x.jpg')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], '"0123456789abcdef"')
+
+    def test_range_requests(self):
+        response = self.get('event_pics/photo.png', range='bytes=5-14')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 5-14/100')
+        self.assertEqual(b''.join(response.streaming_content), b'5678901234')
+        self.assertEqual(b''.join(self.get('event_pics/photo.png', range='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.get('event_pics/photo.png', range='bytes=500-').status_code, 416)
+        # A stale If-Range gets the full body
+        self.assertEqual(self.get('event_pics/photo.png', range='bytes=0-1', if_range='"old"').status_code, 200)
+
+    def test_resolution_is_cached_until_the_file_disappears(self):
+        self.get('event_pics/photo.png')
+        with mock.patch('EventPlanner.views.os.stat', wraps=os.stat) as stat:
+            self.get('event_pics/photo.png')
+        self.assertEqual(stat.call_count, 1)
+        os.remove(os.path.join(self.root, 'event_pics/photo.png'))
+        self.assertEqual(self.get('event_pics/photo.png').status_code, 404)
+
+    def test_rejects_traversal_and_supports_sendfile(self):
+        self.assertEqual(self.get('../manage.py').status_code, 404)
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.get('event_pics/photo.png')
+        self.assertEqual(response['X-Accel-Redirect'], '/internal-media' + os.path.join(self.root, 'event_pics/photo.png'))
+        self.assertEqual(response.content, b'')
+
+
+class MediaStorageTests(TestCase):
+    def test_root_is_resolved_on_first_use_only(self):
+        storage = MediaStorage()
+        with mock.patch('EventPlanner.storage.resolve_media_root', return_value='/tmp/testmedia') as resolve:
+            self.assertFalse(resolve.called)
+            self.assertEqual(storage.location, '/tmp/testmedia')
+            storage.path('a.png')
+            self.assertEqual(resolve.call_count, 1)
+
+    def test_unwritable_root_falls_back_to_tmp(self):
+        with mock.patch.dict(os.environ, {'MEDIA_ROOT': '/proc/no-such-media'}):
+            self.assertEqual(MediaStorage().location, '/tmp/media')
+
+    def test_models_share_one_storage(self):
+        self.assertIs(Event._meta.get_field('image').storage, media_storage())
+        self.assertIs(Profile._meta.get_field('avatar').storage, media_storage())
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caching.reset_metrics()
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+        self.first = make_event(self.creator, days=2, title='First')
+        self.second = make_event(self.creator, days=3, title='Second')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        url = reverse('events-home')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(response, 'First')
+        # Different query strings are different pages
+        self.assertEqual(self.client.get(url, {'search': 'first'})['X-Cache'], 'MISS')
+
+    def test_rsvp_only_invalidates_its_event(self):
+        first_url = reverse('event-detail', args=[self.first.pk])
+        second_url = reverse('event-detail', args=[self.second.pk])
+        for url in (first_url, second_url, reverse('events-home')):
+            self.client.get(url)
+
+        set_rsvp_status(self.first.pk, self.user, 'going')
+        self.assertEqual(self.client.get(second_url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(first_url)['X-Cache'], 'MISS')
+        response = self.client.get(reverse('events-home'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, '1 attending')
+
+        Rating.objects.create(event=self.second, user=self.user, stars=5)
+        self.assertEqual(self.client.get(second_url)['X-Cache'], 'MISS')
+
+    def test_new_event_invalidates_lists(self):
+        self.client.get(reverse('events-home'))
+        make_event(self.creator, days=4, title='Third')
+        self.assertContains(self.client.get(reverse('events-home')), 'Third')
+
+    def test_authenticated_views_use_card_fragments(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('events-home'))
+        self.assertFalse(response.has_header('X-Cache'))
+        self.client.get(reverse('events-home'))
+        self.assertEqual(caching.metrics()['fragment:home-card'], {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+
+        set_rsvp_status(self.second.pk, self.user, 'going')
+        response = self.client.get(reverse('events-home'))
+        self.assertContains(response, '1 attending')
+        self.assertEqual(caching.metrics()['fragment:home-card']['misses'], 3)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get(reverse('events-home'))
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('cache-metrics')).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        data = self.client.get(reverse('cache-metrics')).json()
+        self.assertEqual(data['caches']['page:events-home']['misses'], 1)
+
+
+class EventDetailQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.viewer = User.objects.create_user('viewer', 'viewer@example.com', 'pass')
+        self.event = make_event(self.creator)
+        self.url = reverse('event-detail', args=[self.event.pk])
+
+    def add_attendees(self, count):
+        start = User.objects.count()
+        users = [User.objects.create_user(f'attendee{start + i}') for i in range(count)]
+        RSVP.objects.bulk_create([RSVP(event=self.event, user=user, status='going') for user in users])
+        Event.objects.filter(pk=self.event.pk).update(going_count=RSVP.objects.filter(event=self.event, status='going').count())
+
+    def test_constant_queries(self):
+        RSVP.objects.create(event=self.event, user=self.viewer, status='going')
+        self.client.force_login(self.viewer)
+        for count in (1, 40):
+            with self.subTest(attendees=count):
+                self.add_attendees(count)
+                # session + user with profile + event with viewer RSVP + attendee page
+                with self.assertNumQueries(4):
+                    response = self.client.get(self.url)
+                self.assertEqual(response.context['user_rsvp'].status, 'going')
+
+    def test_anonymous_queries(self):
+        self.add_attendees(3)
+        # event + attendee page
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertIsNone(response.context['user_rsvp'])
+
+    def test_attendee_list_is_paginated(self):
+        self.add_attendees(30)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.context['attendees']), 24)
+        self.assertTrue(response.context['attendees_has_next'])
+        self.assertContains(response, 'Attendees (30)')
+
+        response = self.client.get(self.url, {'attendees_page': 2})
+        self.assertEqual(len(response.context['attendees']), 6)
+        self.assertFalse(response.context['attendees_has_next'])
+        self.assertTrue(response.context['attendees_has_previous'])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_login(self.admin)
+        self.attendee = User.objects.create_user('attendee', 'attendee@example.com', 'pass')
+
+    def add_events(self, count):
+        events = [make_event(self.admin, days=5, title=f'Admin {i}') for i in range(count)]
+        for event in events:
+            RSVP.objects.create(event=event, user=self.attendee, status='going')
+            Rating.objects.create(event=event, user=self.attendee, stars=4)
+            ReminderLog.objects.create(event=event, user=self.attendee, reminder_type='pre_event')
+        return events
+
+    def test_changelists_run_constant_queries(self):
+        urls = [reverse(f'admin:events_{name}_changelist') for name in ('event', 'rsvp', 'rating', 'reminderlog')]
+        counts = {}
+        for batch in (1, 20):
+            self.add_events(batch)
+            for url in urls:
+                with CaptureQueriesContext(connection) as captured:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                counts.setdefault(url, set()).add(len(captured))
+        for url, seen in counts.items():
+            self.assertEqual(len(seen), 1, f'{url}: {seen}')
+
+    def test_event_changelist_sorts_by_average_rating(self):
+        low, high = self.add_events(2)
+        Rating.objects.filter(event=low).update(stars=1)
+        Event.objects.filter(pk=low.pk).update(rating_sum=1)
+        response = self.client.get(reverse('admin:events_event_changelist'), {'o': '-8'})
+        self.assertEqual([e.pk for e in response.context['cl'].result_list], [high.pk, low.pk])
+
+    def run_action(self, action, events):
+        return self.client.post(reverse('admin:events_event_changelist'), {
+            'action': action, '_selected_action': [e.pk for e in events],
+        })
+
+    def test_complete_and_undo_actions(self):
+        events = self.add_events(3)
+        auto = make_event(self.admin, days=-3, auto_complete_hours=1)
+        self.assertTrue(EventJob.objects.filter(event=auto, kind='auto_complete', status='pending').exists())
+
+        # session, user and the changelist setup (6), one id chunk, then one update
+        with self.assertNumQueries(8):
+            self.run_action('mark_completed', events + [auto])
+        self.assertEqual(Event.objects.filter(is_completed=True).count(), 4)
+        jobs.run()
+
+        self.run_action('undo_completed', events + [auto])
+        self.assertFalse(Event.objects.filter(is_completed=True).exists())
+        self.assertFalse(EventJob.objects.filter(event=auto, kind='auto_complete').exists())
+        jobs.run()
+        self.assertFalse(Event.objects.filter(is_completed=True).exists())
+
+    def test_resend_reminders_action(self):
+        events = self.add_events(2)
+        EventJob.objects.filter(event__in=events).delete()
+        self.run_action('resend_reminders', events)
+        self.assertFalse(ReminderLog.objects.filter(event__in=events, reminder_type='pre_event').exists())
+        self.assertEqual(EventJob.objects.filter(event__in=events, kind='event_reminder', due_at__lte=timezone.now()).count(), 2)
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            jobs.run()
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_large_tables_use_estimated_counts(self):
+        self.add_events(3)
+        url = reverse('admin:events_rsvp_changelist')
+        with mock.patch('events.admin.EXACT_COUNT_THRESHOLD', 0), \
+                mock.patch('events.admin.estimated_row_count', return_value=5000000):
+            response = self.client.get(url)
+            self.assertEqual(response.context['cl'].result_count, 5000000)
+            # Filtered changelists still count exactly
+            response = self.client.get(url, {'status__exact': 'going'})
+            self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertEqual(admin_module.estimated_row_count(RSVP), RSVP.objects.order_by('-pk').first().pk)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.creator = User.objects.create_user('creator', 'creator@example.com', 'pass')
+        self.event = make_event(self.creator)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('event-detail', args=[self.event.pk]))
+        timings = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timings), {'total', 'db', 'tpl'})
+        self.assertIn('desc="2 queries (0 duplicated)"', timings['db'])
+        self.assertGreater(float(timings['tpl'].split('=')[1]), 0)
+
+    async def test_async_views_count_their_queries(self):
+        # The async ORM runs queries on a worker thread, with that thread's connections
+        response = await self.async_client.get(reverse('calendar-events-api'))
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries')
+        self.assertGreater(registry.series['queries', 'calendar-events-api'].total, 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        response = self.client.get(reverse('events-home'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registry.series, {})
+
+    def test_duplicate_queries_are_flagged(self):
+        def view(request):
+            for _ in range(4):
+                list(Event.objects.filter(pk=self.event.pk))
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        with self.assertLogs('EventPlanner.middleware', 'WARNING') as logs:
+            response = PerformanceMiddleware(view)(request)
+        self.assertIn('4 queries (1 duplicated)', response['Server-Timing'])
+        self.assertIn('possible N+1', logs.output[0])
+        self.assertEqual(registry.duplicates['unresolved'], 4)
+
+    @override_settings(PERF_METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        for _ in range(3):
+            self.client.get(reverse('events-home'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds{view="events-home",quantile="0.99"}', body)
+        self.assertIn('http_request_db_queries_count{view="events-home"} 3', body)
+        self.assertIn('event_cache_requests_total{cache="page:events-home",result="hits"} 2', body)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_generate_data(self):
+        call_command('generate_data', users=30, events=20, rsvps=200, ratings=20, reminder_logs=20, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='synth').count(), 30)
+        self.assertEqual(User.objects.filter(profile__isnull=True).count(), 0)
+        self.assertEqual(Event.objects.count(), 20)
+        self.assertTrue(0 < RSVP.objects.count() <= 200)
+        self.assertFalse(Rating.objects.filter(event__date__gte=timezone.now().date()).exists())
+        for event in Event.objects.all():
+            self.assertEqual(event.going_count, event.rsvps.filter(status='going').count())
+            self.assertIsNotNone(event.end_datetime)
+
+    def test_bench_routes_writes_json(self):
+        call_command('generate_data', users=10, events=10, rsvps=50, past_fraction=0.2, stdout=StringIO())
+        rsvps = RSVP.objects.count()
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+
+        call_command('bench_routes', repeat=2, warmup=0, output=output, stdout=StringIO())
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(report['results']['event-detail']['samples'], 2)
+        self.assertIn('cron-complete-due-events', report['results'])
+        self.assertEqual(RSVP.objects.count(), rsvps)
+
+    def test_bench_login_shows_profile_queries(self):
+        out = StringIO()
+        call_command('bench_login', repeat=2, stdout=out)
+        legacy, current = out.getvalue().splitlines()
+        self.assertIn('(2 on accounts_profile)', legacy)
+        self.assertIn('(0 on accounts_profile)', current)
+        self.assertFalse(User.objects.filter(username='bench-login').exists())
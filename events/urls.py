@@ -1,8 +1,10 @@
 from django.urls import path
+from . import api
 from .views import (
     EventListView, EventDetailView, EventCreateView, 
     EventUpdateView, EventDeleteView, CompletedEventsView,
-    rsvp_event, rate_event, mark_event_completed, undo_event_completed, my_rsvps, calendar_events_api
+    rsvp_event, rate_event, mark_event_completed, undo_event_completed, my_rsvps, organizer_summary, calendar_events_api,
+    upcoming_events_ics, event_ics, my_rsvps_ics, cache_metrics
 )
 
 urlpatterns = [
@@ -17,5 +19,15 @@ urlpatterns = [
     path('event/<int:pk>/undo-complete/', undo_event_completed, name='event-undo-complete'),
     path('completed/', CompletedEventsView.as_view(), name='completed-events'),
     path('my-rsvps/', my_rsvps, name='my-rsvps'),
+    path('organizer/', organizer_summary, name='organizer-summary'),
     path('api/calendar-events/', calendar_events_api, name='calendar-events-api'),
+    path('api/v1/events/', api.event_list, name='api-v1-events'),
+    path('api/v1/events/<int:pk>/', api.event_detail, name='api-v1-event'),
+    path('api/v1/events/<int:pk>/rsvp/', api.event_rsvp, name='api-v1-event-rsvp'),
+    path('api/v1/events/<int:pk>/rating/', api.event_rating, name='api-v1-event-rating'),
+    path('api/v1/rsvps/bulk/', api.bulk_rsvp, name='api-v1-rsvps-bulk'),
+    path('calendar/upcoming.ics', upcoming_events_ics, name='upcoming-events-ics'),
+    path('event/<int:pk>/event.ics', event_ics, name='event-ics'),
+    path('calendar/my/<str:token>.ics', my_rsvps_ics, name='my-rsvps-ics'),
+    path('cache-metrics/', cache_metrics, name='cache-metrics'),
 ]
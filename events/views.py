@@ -1,38 +1,60 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, aget_object_or_404, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import Http404, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q, Count, Exists, Max, OuterRef, Subquery, Sum
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
 from datetime import datetime, timedelta, date as date_cls
+import hashlib
 import json
 
+from . import caching
+from .caching import AnonymousPageCacheMixin
 from .models import Event, RSVP, Rating
 from .forms import EventForm, RSVPForm, RatingForm, EventSearchForm
+from .ics import ICS_FIELDS, feed_token, iter_calendar, user_id_from_token
+from .pagination import KeysetPaginationMixin
+from .search import search_events
+from .services import set_rsvp_status, promote_waitlist
 
 
-class EventListView(ListView):
+MY_RSVPS_PER_PAGE = 10
+ORGANIZER_EVENTS_PER_PAGE = 10
+ATTENDEES_PER_PAGE = 24
+# How far back the private RSVP calendar feed reaches
+ICS_FEED_HISTORY_DAYS = 30
+TOTAL_EVENTS_CACHE_SECONDS = 60
+
+
+class EventListView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     model = Event
     template_name = 'events/home.html'
     context_object_name = 'events'
     paginate_by = 6
+    pagination_mode = 'keyset'
+    page_cache_name = 'events-home'
     
     def get_queryset(self):
         # Show all events created by users instead of filtering by end time
-        queryset = Event.objects.all()
+        queryset = Event.objects.select_related('creator')
         
         # Search functionality
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(location__icontains=search_query)
-            )
+            queryset = search_events(queryset, search_query)
         
         # Location filter
         location_filter = self.request.GET.get('location')
@@ -48,37 +70,54 @@ class EventListView(ListView):
         if date_to:
             queryset = queryset.filter(date__lte=date_to)
         
-        # Avoid clashing with Event.attendee_count @property by using a different annotation name
-        queryset = queryset.annotate(going_count=Count('rsvps', filter=Q(rsvps__status='going')))
         # Order events by scheduled date and time
         return queryset.order_by('date', 'time')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_form'] = EventSearchForm(self.request.GET)
-        context['total_events'] = Event.objects.count()  # Count all events, not just upcoming
+        # Count all events, not just upcoming; cached briefly since it is only a headline stat
+        context['total_events'] = cache.get_or_set('events:total-count', Event.objects.count, TOTAL_EVENTS_CACHE_SECONDS)
+        caching.attach_versions(context['events'])
         return context
+    
+    def page_cache_dependencies(self, context):
+        return ['list'] + [caching.event_dependency(event.pk) for event in context['events']]
 
 
-class EventDetailView(DetailView):
+class EventDetailView(AnonymousPageCacheMixin, DetailView):
     model = Event
     template_name = 'events/event_detail.html'
+    page_cache_name = 'event-detail'
+    
+    def page_cache_dependencies(self, context):
+        return [caching.event_dependency(context['object'].pk)]
+    
+    def get_queryset(self):
+        # Event, organizer and the viewer's RSVP in one query; going/rating totals are columns on Event
+        queryset = Event.objects.select_related('creator')
+        if self.request.user.is_authenticated:
+            viewer_rsvp = RSVP.objects.filter(event=OuterRef('pk'), user=self.request.user)
+            queryset = queryset.annotate(
+                viewer_rsvp_id=Subquery(viewer_rsvp.values('pk')[:1]),
+                viewer_rsvp_status=Subquery(viewer_rsvp.values('status')[:1]),
+            )
+        return queryset
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        event = self.get_object()
+        event = self.object
         
         # Check if user has RSVP'd
         user_rsvp = None
-        if self.request.user.is_authenticated:
-            try:
-                user_rsvp = RSVP.objects.get(event=event, user=self.request.user)
-            except RSVP.DoesNotExist:
-                pass
+        if getattr(event, 'viewer_rsvp_id', None):
+            user_rsvp = RSVP(
+                pk=event.viewer_rsvp_id, event=event, user=self.request.user, status=event.viewer_rsvp_status
+            )
         
         context['user_rsvp'] = user_rsvp
         context['rsvp_form'] = RSVPForm()
-        context['attendees'] = event.rsvps.filter(status='going').select_related('user')
+        context.update(self._attendees_page(event))
         
         # Calculate time until event
         if not event.is_past:
@@ -101,6 +140,27 @@ class EventDetailView(DetailView):
             context['capacity_percentage'] = min(capacity_percentage, 100)  # Cap at 100%
         
         return context
+    
+    def _attendees_page(self, event):
+        """One bounded page of going RSVPs; the total comes from going_count, not a COUNT."""
+        try:
+            page = max(int(self.request.GET.get('attendees_page', 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * ATTENDEES_PER_PAGE
+        attendees = list(
+            event.rsvps.filter(status='going')
+            .select_related('user__profile')
+            # Only what the attendee cards show; the avatar is a stored URL, no rendition JSON
+            .only('event', 'status', 'created_at', 'user__username', 'user__first_name', 'user__profile__avatar_thumb_url')
+            .order_by('created_at', 'pk')[offset:offset + ATTENDEES_PER_PAGE]
+        )
+        return {
+            'attendees': attendees,
+            'attendees_page': page,
+            'attendees_has_previous': page > 1,
+            'attendees_has_next': offset + len(attendees) < event.going_count,
+        }
 
 
 class EventCreateView(LoginRequiredMixin, CreateView):
@@ -121,7 +181,11 @@ class EventUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     
     def form_valid(self, form):
         messages.success(self.request, 'Event updated successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        # A capacity increase frees seats for waitlisted users
+        with transaction.atomic():
+            promote_waitlist(self.object.pk)
+        return response
     
     def test_func(self):
         event = self.get_object()
@@ -143,8 +207,8 @@ class EventDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 @login_required
-def rsvp_event(request, pk):
-    event = get_object_or_404(Event, pk=pk)
+async def rsvp_event(request, pk):
+    event = await aget_object_or_404(Event, pk=pk)
     
     # Prevent RSVP updates for completed events or past events
     if event.is_completed:
@@ -158,18 +222,15 @@ def rsvp_event(request, pk):
     if request.method == 'POST':
         form = RSVPForm(request.POST)
         if form.is_valid():
-            rsvp, created = RSVP.objects.get_or_create(
-                event=event,
-                user=request.user,
-                defaults={'status': form.cleaned_data['status']}
-            )
-            
-            if not created:
-                rsvp.status = form.cleaned_data['status']
-                rsvp.save()
+            # The seat claim needs a transaction, which the async ORM cannot open
+            user = await request.auser()
+            status = await sync_to_async(set_rsvp_status)(event.pk, user, form.cleaned_data['status'])
             
-            status_text = 'going' if form.cleaned_data['status'] == 'going' else 'not going'
-            messages.success(request, f'RSVP updated! You are {status_text} to this event.')
+            if status == 'waitlisted':
+                messages.warning(request, 'This event is full. You have been added to the waitlist.')
+            else:
+                status_text = 'going' if status == 'going' else 'not going'
+                messages.success(request, f'RSVP updated! You are {status_text} to this event.')
         else:
             messages.error(request, 'There was an error with your RSVP.')
     
@@ -240,7 +301,7 @@ def mark_event_completed(request, pk):
     
     # Mark event as completed
     event.is_completed = True
-    event.save()
+    event.save(update_fields=['is_completed', 'updated_at'])
     
     messages.success(request, f'Event "{event.title}" has been marked as completed!')
     
@@ -265,7 +326,7 @@ def undo_event_completed(request, pk):
     
     # Undo the completed status
     event.is_completed = False
-    event.save()
+    event.save(update_fields=['is_completed', 'updated_at'])
     
     messages.success(request, f'Event "{event.title}" is no longer marked as completed!')
     
@@ -273,26 +334,46 @@ def undo_event_completed(request, pk):
     return redirect('event-detail', pk=pk)
 
 
-class CompletedEventsView(ListView):
+class CompletedEventsView(AnonymousPageCacheMixin, KeysetPaginationMixin, ListView):
     model = Event
     template_name = 'events/completed_events.html'
     context_object_name = 'events'
     paginate_by = 6
+    pagination_mode = 'keyset'
+    keyset_descending = True
+    page_cache_name = 'completed-events'
+    
+    @cached_property
+    def now(self):
+        return timezone.now()
+    
+    def get_keyset_branches(self):
+        # Events marked completed come from the partial index, whatever their date. An event that
+        # has ended has started, so the date bound (redundant for the result) lets that walk start
+        # at today in the (date, time, id) index instead of passing every upcoming event
+        return [Q(is_completed=True), Q(end_datetime__lt=self.now, date__lte=timezone.localdate(self.now))]
     
     def get_queryset(self):
-        # Avoid clashing with Event.attendee_count @property by using a different annotation name
+        # going_count is a denormalized column on Event, no aggregation join needed
         queryset = Event.objects.filter(
-            Q(is_completed=True) | Q(end_datetime__lt=timezone.now())
-        ).annotate(going_count=Count('rsvps', filter=Q(rsvps__status='going')))
+            Q(is_completed=True) | Q(end_datetime__lt=self.now)
+        ).select_related('creator')
+        
+        # Fetch the viewer's rating and attendance in the same query (used for can_rate)
+        if self.request.user.is_authenticated:
+            queryset = queryset.annotate(
+                user_rating_stars=Subquery(
+                    Rating.objects.filter(event=OuterRef('pk'), user=self.request.user).values('stars')[:1]
+                ),
+                user_going=Exists(
+                    RSVP.objects.filter(event=OuterRef('pk'), user=self.request.user, status='going')
+                ),
+            )
         
         # Search functionality
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(location__icontains=search_query)
-            )
+            queryset = search_events(queryset, search_query)
         
         return queryset.order_by('-date', '-time')
     
@@ -302,73 +383,222 @@ class CompletedEventsView(ListView):
         
         if self.request.user.is_authenticated:
             for event in context['events']:
-                # Check if user can rate (event is past, user hasn't rated yet, AND user attended the event)
-                try:
-                    user_rating = Rating.objects.get(event=event, user=self.request.user)
-                    event.can_rate = False  # User already rated
-                    event.user_rating = user_rating
-                except Rating.DoesNotExist:
-                    # Check if user actually attended the event
-                    try:
-                        user_rsvp = RSVP.objects.get(event=event, user=self.request.user)
-                        if user_rsvp.status == 'going':
-                            event.can_rate = True  # User can rate (event is past and user attended)
-                        else:
-                            event.can_rate = False  # User didn't attend
-                    except RSVP.DoesNotExist:
-                        event.can_rate = False  # User never RSVP'd
+                # User can rate if they attended and have not rated yet
+                event.user_rating = event.user_rating_stars
+                event.can_rate = event.user_rating is None and event.user_going
         
         context['rating_form'] = RatingForm()
+        caching.attach_versions(context['events'])
         return context
+    
+    def page_cache_dependencies(self, context):
+        return ['list'] + [caching.event_dependency(event.pk) for event in context['events']]
 
 
 @login_required
 def my_rsvps(request):
+    today = timezone.now().date()
     upcoming_rsvps = RSVP.objects.filter(
         user=request.user,
-        event__date__gte=timezone.now().date()
+        event__date__gte=today
     ).select_related('event').order_by('event__date', 'event__time')
     
+    # Annotate the user's rating so past RSVPs need no per-row Rating lookup
     past_rsvps = RSVP.objects.filter(
         user=request.user,
-        event__date__lt=timezone.now().date()
-    ).select_related('event').order_by('-event__date', '-event__time')
+        event__date__lt=today
+    ).select_related('event').annotate(
+        user_rating_stars=Subquery(
+            Rating.objects.filter(event=OuterRef('event'), user=request.user).values('stars')[:1]
+        )
+    ).order_by('-event__date', '-event__time')
+    
+    upcoming_page = Paginator(upcoming_rsvps, MY_RSVPS_PER_PAGE).get_page(request.GET.get('upcoming_page'))
+    past_page = Paginator(past_rsvps, MY_RSVPS_PER_PAGE).get_page(request.GET.get('past_page'))
     
     # Add rating context for past events
-    for rsvp in past_rsvps:
-        try:
-            user_rating = Rating.objects.get(event=rsvp.event, user=request.user)
-            rsvp.event.can_rate = False  # User already rated
-            rsvp.event.user_rating = user_rating
-        except Rating.DoesNotExist:
-            # Only allow rating if user actually attended the event
-            if rsvp.status == 'going':
-                rsvp.event.can_rate = True  # User can rate (event is past and user attended)
-            else:
-                rsvp.event.can_rate = False  # User didn't attend
+    for rsvp in past_page:
+        rsvp.event.user_rating = rsvp.user_rating_stars
+        # Only allow rating if user actually attended the event and has not rated yet
+        rsvp.event.can_rate = rsvp.user_rating_stars is None and rsvp.status == 'going'
     
     return render(request, 'events/my_rsvps.html', {
-        'upcoming_rsvps': upcoming_rsvps,
-        'past_rsvps': past_rsvps,
-        'rating_form': RatingForm()
+        'upcoming_rsvps': upcoming_page,
+        'past_rsvps': past_page,
+        'rating_form': RatingForm(),
+        'ics_feed_url': request.build_absolute_uri(reverse('my-rsvps-ics', args=[feed_token(request.user.pk)])),
     })
 
 
-def calendar_events_api(request):
-    """API endpoint for calendar view. Shows all events created by users."""
-    # Show all events instead of filtering by date range
-    events_qs = Event.objects.all().order_by('date', 'time')
-
-    events_data = []
-    for event in events_qs:
-        events_data.append({
-            'id': event.id,
-            'title': event.title,
-            'start': f"{event.date}T{event.time}",
-            'url': reverse('event-detail', args=[event.id]),
-            'backgroundColor': '#FF7F50',
-            'borderColor': '#FF8C42',
-            'textColor': '#ffffff'
-        })
-
-    return JsonResponse(events_data, safe=False)
+@login_required
+def organizer_summary(request):
+    """Rating breakdown of the events the user organizes, read from the per-event counters."""
+    events_qs = Event.objects.filter(creator=request.user)
+    totals = events_qs.aggregate(
+        events=Count('pk'),
+        attendees=Sum('going_count', default=0),
+        ratings=Sum('rating_count', default=0),
+        stars=Sum('rating_sum', default=0),
+        **{field: Sum(field, default=0) for field in Event.RATING_HISTOGRAM_FIELDS},
+    )
+    # Same shape as Event.rating_histogram, over every event the user organizes
+    totals['average'] = totals['stars'] / totals['ratings'] if totals['ratings'] else 0
+    totals['histogram'] = [
+        {
+            'stars': stars,
+            'count': totals[f'rating_stars_{stars}'],
+            'percent': round(100 * totals[f'rating_stars_{stars}'] / totals['ratings']) if totals['ratings'] else 0,
+        }
+        for stars in range(5, 0, -1)
+    ]
+    
+    events_page = Paginator(events_qs.order_by('-date', '-time', '-pk'), ORGANIZER_EVENTS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'events/organizer_summary.html', {
+        'totals': totals,
+        'events': events_page,
+    })
+
+
+def _feed_validators(events_qs, *key, rsvps=None):
+    """Return ``(etag, last_modified_timestamp)`` for a feed over ``events_qs``.
+
+    Row count is part of the ETag so deletions inside the feed change it too.
+    ``rsvps`` (a per-user feed's RSVPs) adds their latest change and going
+    count, so swapping one RSVP for another also changes the validators.
+    """
+    state = events_qs.order_by().aggregate(last_modified=Max('updated_at'), total=Count('id'))
+    if rsvps is not None:
+        rsvp_state = rsvps.order_by().aggregate(
+            last_modified=Max('updated_at'), going=Count('pk', filter=Q(status='going'))
+        )
+        key += (rsvp_state['going'],)
+        state['last_modified'] = max(
+            filter(None, (state['last_modified'], rsvp_state['last_modified'])), default=None
+        )
+    return _validators_from_state(state, key)
+
+
+async def _afeed_validators(events_qs, *key):
+    state = await events_qs.order_by().aaggregate(last_modified=Max('updated_at'), total=Count('id'))
+    return _validators_from_state(state, key)
+
+
+def _validators_from_state(state, key):
+    last_modified = state['last_modified']
+    etag = quote_etag(hashlib.md5(
+        f"{'|'.join(map(str, key))}|{state['total']}|{last_modified and last_modified.isoformat()}".encode()
+    ).hexdigest())
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def _set_feed_cache_headers(response, etag, last_modified_ts, max_age, private=False):
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    patch_cache_control(response, max_age=max_age, must_revalidate=True, **({'private': True} if private else {}))
+    return response
+
+
+def _parse_window_bound(value):
+    """Parse a FullCalendar ``start``/``end`` parameter (ISO date or datetime) to a date."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value) or parse_date(value[:10])
+    except ValueError:
+        return None
+    return parsed.date() if isinstance(parsed, datetime) else parsed
+
+
+async def calendar_events_api(request):
+    """API endpoint for calendar view.
+
+    Honors FullCalendar's ``start``/``end`` window (served from the
+    ``(date, time)`` index) and answers conditional GETs with 304 when
+    nothing in the window changed. Without a window every event is returned.
+    Runs natively under ASGI, so waiting on the database holds no thread.
+    """
+    events_qs = Event.objects.order_by('date', 'time')
+    start = _parse_window_bound(request.GET.get('start'))
+    end = _parse_window_bound(request.GET.get('end'))
+    if start:
+        events_qs = events_qs.filter(date__gte=start)
+    if end:
+        # FullCalendar's end bound is exclusive
+        events_qs = events_qs.filter(date__lt=end)
+
+    etag, last_modified_ts = await _afeed_validators(events_qs, start, end)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if not_modified is None:
+        # Build detail URLs from one reverse() instead of one per row
+        url_prefix, url_suffix = reverse('event-detail', args=[0]).rsplit('0', 1)
+        events_data = [
+            {
+                'id': event['id'],
+                'title': event['title'],
+                'start': f"{event['date']}T{event['time']}",
+                'url': f"{url_prefix}{event['id']}{url_suffix}",
+                'backgroundColor': '#FF7F50',
+                'borderColor': '#FF8C42',
+                'textColor': '#ffffff'
+            }
+            async for event in events_qs.values('id', 'title', 'date', 'time')
+        ]
+        response = JsonResponse(events_data, safe=False)
+    else:
+        response = not_modified
+
+    return _set_feed_cache_headers(
+        response, etag, last_modified_ts, getattr(settings, 'CALENDAR_FEED_MAX_AGE', 0)
+    )
+
+
+def _ics_response(request, events_qs, name, filename, private=False, rsvps=None):
+    etag, last_modified_ts = _feed_validators(events_qs, request.path, rsvps=rsvps)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        url_prefix, url_suffix = request.build_absolute_uri(reverse('event-detail', args=[0])).rsplit('0', 1)
+        rows = events_qs.values(*ICS_FIELDS).iterator(chunk_size=500)
+        response = StreamingHttpResponse(
+            iter_calendar(rows, name, request.get_host(), url_prefix, url_suffix),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return _set_feed_cache_headers(
+        response, etag, last_modified_ts, getattr(settings, 'ICS_FEED_MAX_AGE', 300), private=private
+    )
+
+
+def upcoming_events_ics(request):
+    """iCalendar feed of every upcoming event."""
+    events_qs = Event.objects.filter(date__gte=timezone.now().date(), is_completed=False).order_by('date', 'time')
+    return _ics_response(request, events_qs, 'Event Planner', 'upcoming-events.ics')
+
+
+def event_ics(request, pk):
+    """iCalendar file for a single event."""
+    events_qs = Event.objects.filter(pk=pk)
+    if not events_qs.exists():
+        raise Http404('Event not found')
+    return _ics_response(request, events_qs, 'Event Planner', f'event-{pk}.ics')
+
+
+def my_rsvps_ics(request, token):
+    """Private iCalendar feed of a user's going RSVPs, addressed by a signed token."""
+    user_id = user_id_from_token(token)
+    if user_id is None:
+        raise Http404('Unknown feed')
+    since = timezone.now().date() - timedelta(days=ICS_FEED_HISTORY_DAYS)
+    events_qs = Event.objects.filter(
+        rsvps__user_id=user_id, rsvps__status='going', date__gte=since
+    ).order_by('date', 'time')
+    return _ics_response(
+        request, events_qs, 'Event Planner - My events', 'my-events.ics',
+        private=True, rsvps=RSVP.objects.filter(user_id=user_id),
+    )
+
+
+@staff_member_required
+def cache_metrics(request):
+    """Per-process hit/miss counts of the page and fragment caches."""
+    return JsonResponse({'caches': caching.metrics()})